@@ -1,13 +1,23 @@
-from app.database.models import Penalty, init_db
+from app.database.models import init_db
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-import uuid
+
+# Fill missing penalty IDs with version 4 UUIDs generated inside SQLite, in the
+# same hyphenated format as str(uuid.uuid4()), so no rows are loaded into Python
+BACKFILL_PENALTY_IDS = text("""
+    UPDATE penalties
+    SET penalty_id = lower(hex(randomblob(4))) || '-' || lower(hex(randomblob(2))) || '-4' ||
+        substr(lower(hex(randomblob(2))), 2) || '-' || substr('89ab', 1 + (abs(random()) % 4), 1) ||
+        substr(lower(hex(randomblob(2))), 2) || '-' || lower(hex(randomblob(6)))
+    WHERE penalty_id IS NULL
+""")
 
 def add_guids_to_penalties():
+    # The shared engine runs configure_connection on every new SQLite
+    # connection, so SQLITE_PRAGMAS are already applied here
     engine = init_db()
     with Session(engine) as session:
-        penalties = session.query(Penalty).all()
-        for penalty in penalties:
-            penalty.penalty_id = str(uuid.uuid4())
+        session.execute(BACKFILL_PENALTY_IDS)
         session.commit()
 
 if __name__ == "__main__":
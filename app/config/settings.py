@@ -24,6 +24,14 @@ class Settings(BaseSettings):
         description="Database connection string. For SQLite, use sqlite:///path/to/database.db"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
+    DB_POOL_SIZE: int = Field(
+        default=5,
+        gt=0,
+        description="Number of worker threads (and pooled connections) used for blocking database calls"
+    )
+    DB_MAX_OVERFLOW: int = Field(default=10, ge=0, description="Connections allowed beyond DB_POOL_SIZE under load")
+    DB_POOL_RECYCLE: int = Field(default=1800, description="Seconds before a server database connection is replaced")
+    DB_PRE_PING: bool = Field(default=True, description="Test server database connections on checkout")
     
     # Security settings
     SECRET_KEY: SecretStr = Field(
@@ -31,6 +39,7 @@ class Settings(BaseSettings):
         description="Secret key for signing tokens. Must be kept secret in production."
     )
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=60, gt=0)
+    API_KEY: str = Field(default="default_api_key")
     
     # Rate limiting
     RATE_LIMIT_WINDOW: int = Field(default=60, gt=0)
@@ -108,14 +117,7 @@ class Settings(BaseSettings):
         extra="ignore"
     )
 
-@lru_cache
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
     """Get application settings with caching for better performance"""
     return Settings()
-
-class Settings:
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///database/penalties.db")
-    API_KEY: str = os.getenv("API_KEY", "default_api_key")
-    DEBUG: bool = os.getenv("DEBUG", "False").lower() in ("true", "1", "yes")
-
-settings = Settings()
@@ -1,20 +1,140 @@
+import codecs
 import csv
+import io
 import re
 import sqlite3
 import os
-from datetime import datetime
+from datetime import date, datetime
+from types import MappingProxyType
+from functools import lru_cache
+from operator import itemgetter
+from app.database import apply_sqlite_migrations, configure_connection
 from app.services.logging_utils import log_action
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Cashbox exports write dates as DD-MM-YYYY
+DMY_DATE_PATTERN = re.compile(r'^(\d{2})-(\d{2})-(\d{4})$')
+
+# Cashbox export file names, e.g. cashbox-dues-01-02-2024-123456.csv
+FILE_NAME_PATTERN = re.compile(r'^cashbox-(dues|punishments|transactions)-\d{2}-\d{2}-\d{4}-\d{6}\.csv$')
+FILE_PREFIX_PATTERN = re.compile(r'^cashbox-(dues|punishments|transactions)-')
+
+# Header prefixes identifying each file type, in detection priority order
+FILE_TYPE_PREFIXES = (
+    (('penatly_', 'penalty_'), 'punishments'),  # Punishment exports may misspell the headers
+    (('due_',), 'dues'),
+    (('transaction_',), 'transactions')
+)
+
+# Fix column names based on file type. The per-type mappings are read-only
+# so the same objects can be shared by every import.
+COLUMN_MAPPING = {
+    'punishments': MappingProxyType({
+        'penalty_created': 'created',
+        'penatly_created': 'created',  # Handle both spellings
+        'penalty_user': 'user',
+        'penatly_user': 'user',
+        'username': 'user',  # Map username to user
+        'penalty_reason': 'reason',
+        'penatly_reason': 'reason',
+        'penalty_name': 'reason',  # Map penalty_name to reason
+        'penalty_archived': 'archived',
+        'penatly_archived': 'archived',
+        'penalty_paid': 'paid_date',
+        'penatly_paid': 'paid_date',
+        'user_payment_date': 'paid_date',  # Add mapping for user_payment_date
+        'penalty_amount': 'amount',
+        'penatly_amount': 'amount',
+        'penalty_currency': 'currency',
+        'penatly_currency': 'currency',
+        'penalty_subject': 'subject',
+        'penatly_subject': 'subject'
+    }),
+    'dues': MappingProxyType({
+        'due_created': 'created',
+        'due_user': 'user',
+        'username': 'user',  # Map username to user
+        'due_reason': 'reason',
+        'due_name': 'reason',  # Map due_name to reason
+        'due_archived': 'archived',
+        'due_paid': 'paid_date',
+        'user_payment_date': 'paid_date',  # Add mapping for user_payment_date
+        'due_amount': 'amount',
+        'due_currency': 'currency',
+        'due_subject': 'subject'
+    }),
+    'transactions': MappingProxyType({
+        'transaction_created': 'created',
+        'transaction_user': 'user',
+        'username': 'user',  # Map username to user
+        'transaction_reason': 'reason',
+        'transaction_name': 'reason',  # Map transaction_name to reason
+        'transaction_amount': 'amount',
+        'transaction_currency': 'currency',
+        'transaction_subject': 'subject'
+    })
+}
+
+# Insert statements per file type. They are module constants so every batch
+# reuses the same SQL text and hits SQLite's prepared statement cache.
+DUE_QUERY = '''
+    INSERT INTO dues (
+        user_id, team_id, due_created, due_reason,
+        due_archived, due_amount, due_currency, 
+        due_subject, search_params, due_paid_date, user_paid
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+PUNISHMENT_QUERY = '''
+    INSERT INTO punishments (
+        user_id, team_id, penalty_created, penalty_reason,
+        penalty_archived, penalty_amount, penalty_currency, 
+        penalty_subject, search_params, penalty_paid_date
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+TRANSACTION_QUERY = '''
+    INSERT INTO transactions (
+        user_id, team_id, transaction_created, transaction_reason,
+        transaction_amount, transaction_currency, transaction_subject,
+        search_params
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_QUERIES = {
+    'dues': DUE_QUERY,
+    'punishments': PUNISHMENT_QUERY,
+    'transactions': TRANSACTION_QUERY
+}
+
+# Import records are assembled as (user_id, team_id, created, reason, archived,
+# amount, currency, subject, search_params, paid_date, user_paid); each file
+# type inserts the subset of those fields picked by its getter.
+RECORD_FIELDS = {
+    'dues': itemgetter(0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10),
+    'punishments': itemgetter(0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+    'transactions': itemgetter(0, 1, 2, 3, 5, 6, 7, 8)
+}
+
+# Read buffer for import files; exports are read front to back in large blocks
+CSV_BUFFER_SIZE = 1 << 20
+
+# Maximum number of bound parameters used in a single IN (...) lookup
+PARAMETER_CHUNK_SIZE = 500
+
 # Define our own database connection functions to avoid import issues
 def get_db_connection():
-    """Get a connection to the SQLite database"""
+    """Get a connection to the SQLite database, with the shared SQLite PRAGMAs applied"""
     db_path = os.path.join('database', 'penalties.db')
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
+    configure_connection(conn)
     return conn
 
 def init_db():
@@ -25,10 +145,13 @@ def init_db():
         os.makedirs(os.path.dirname(db_path))
         logger.info(f"Created database directory: {os.path.dirname(db_path)}")
     
-    # Just verify we can connect
+    # Verify we can connect and bring the schema's columns and indexes up to date
     try:
         conn = get_db_connection()
-        conn.close()
+        try:
+            apply_sqlite_migrations(conn)
+        finally:
+            conn.close()
         logger.info("Database connection successful")
     except Exception as e:
         logger.error(f"Database connection error: {e}")
@@ -45,51 +168,84 @@ def truncate_table(cursor, table_name):
         logger.error(f"Error truncating table {table_name}: {e}")
         raise
 
+def drop_table_indexes(cursor, table_name):
+    """
+    Drop the explicit indexes of a table before a bulk load.
+    
+    Returns:
+        list: The CREATE INDEX statements needed to restore them afterwards
+    """
+    cursor.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table_name,)
+    )
+    indexes = cursor.fetchall()
+    for index_name, _ in indexes:
+        cursor.execute(f'DROP INDEX "{index_name}"')
+    return [index_sql for _, index_sql in indexes]
+
+def restore_table_indexes(cursor, index_statements):
+    """Recreate indexes dropped by drop_table_indexes in a single build each"""
+    for index_sql in index_statements:
+        cursor.execute(index_sql)
+
+def open_csv(file_path):
+    """Open a CSV file for csv.reader with a large read buffer, skipping a UTF-8 BOM once"""
+    raw = open(file_path, mode='rb', buffering=CSV_BUFFER_SIZE)
+    if raw.peek(len(codecs.BOM_UTF8)).startswith(codecs.BOM_UTF8):
+        raw.read(len(codecs.BOM_UTF8))
+    return io.TextIOWrapper(raw, encoding='utf-8', newline='')
+
 def get_files_to_import(directory):
     """Get all CSV files that match our naming pattern"""
-    pattern = re.compile(r'^cashbox-(dues|punishments|transactions)-\d{2}-\d{2}-\d{4}-\d{6}\.csv$')
-    for filename in os.listdir(directory):
-        if pattern.match(filename):
-            file_type = filename.split('-')[1]  # dues, punishments, or transactions
-            yield (os.path.join(directory, filename), file_type)
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            match = FILE_NAME_PATTERN.match(entry.name)
+            if match:
+                yield (entry.path, match.group(1))  # dues, punishments, or transactions
 
 def detect_file_type(file_path):
     """Detect file type by examining the CSV headers"""
     try:
-        with open(file_path, mode='r', encoding='utf-8-sig') as file:
-            reader = csv.DictReader(file, delimiter=';')
-            headers = reader.fieldnames
-            if headers:
-                # Fix for punishments with misspelled headers
-                if any(h.startswith('penatly_') for h in headers):
-                    return 'punishments'
-                elif any(h.startswith('penalty_') for h in headers):
-                    return 'punishments'
-                elif any(h.startswith('due_') for h in headers):
-                    return 'dues'
-                elif any(h.startswith('transaction_') for h in headers):
-                    return 'transactions'
+        # Only the header line is needed, so don't set up a full reader
+        with open(file_path, mode='rb') as file:
+            header_line = file.readline().decode('utf-8-sig')
+        headers = next(csv.reader([header_line], delimiter=';'), [])
+        for prefixes, file_type in FILE_TYPE_PREFIXES:
+            if any(h.startswith(prefixes) for h in headers):
+                return file_type
     except Exception as e:
         logger.error(f"Error detecting file type: {e}")
     return None
 
-def convert_payment_status(status, paid_date):
-    """Convert payment status from CSV to database format"""
-    if status == "STATUS_EXEMPT":
-        # For exempt status, we set paid_date but preserve the status
-        return paid_date if paid_date else datetime.now().strftime('%Y-%m-%d')
-    elif status == "STATUS_PAID" and paid_date:
-        return paid_date
-    return None
+@lru_cache(maxsize=4096)
+def convert_date(value, date_format='%d-%m-%Y'):
+    """
+    Convert a CSV date to the YYYY-MM-DD database format.
+    
+    Results are memoized since export dates repeat heavily, and DD-MM-YYYY
+    values are reformatted from a regex match instead of going through
+    strptime/strftime. Raises ValueError for invalid dates.
+    """
+    if date_format == '%d-%m-%Y':
+        match = DMY_DATE_PATTERN.match(value)
+        if match:
+            day, month, year = match.groups()
+            date(int(year), int(month), int(day))  # Reject impossible dates like strptime does
+            return f"{year}-{month}-{day}"
+    return datetime.strptime(value, date_format).strftime('%Y-%m-%d')
 
 def extract_user_from_subject(subject):
     """Extract username from transaction subject if possible"""
-    if ': ' in subject:
-        parts = subject.split(': ')
-        if len(parts) > 1:
-            user_part = parts[1]
-            if ' (' in user_part:
-                return user_part.split(' (')[0]
+    _, separator, rest = subject.partition(': ')
+    if separator:
+        # The user is named between the first ': ' and ' (', e.g. "Payment: Anna (Fine)"
+        user_part = rest.partition(': ')[0]
+        name, bracket, _ = user_part.partition(' (')
+        if bracket:
+            return name
     return None
 
 def process_batch(cursor, batch_data, query):
@@ -101,6 +257,48 @@ def process_batch(cursor, batch_data, query):
         return batch_size
     return 0
 
+def insert_new_teams(cursor, new_teams, teams_map):
+    """
+    Create all teams first seen in an import file with multi-row INSERTs.
+    
+    Args:
+        cursor: Cursor inside the import transaction
+        new_teams: Mapping of team_id to the team_name of the row it first appeared in
+        teams_map: Mapping of team_id to team_name, updated in place
+    """
+    teams = list(new_teams.items())
+    # Two bound parameters per team
+    chunk_size = PARAMETER_CHUNK_SIZE // 2
+    for start in range(0, len(teams), chunk_size):
+        chunk = teams[start:start + chunk_size]
+        values = ','.join(['(?, ?)'] * len(chunk))
+        cursor.execute(
+            f'INSERT OR IGNORE INTO teams (team_id, team_name) VALUES {values}',
+            [value for team in chunk for value in team]
+        )
+    teams_map.update(new_teams)
+
+def insert_new_users(cursor, new_users, users_cache):
+    """
+    Create all users first seen in an import file with one executemany and
+    load their generated IDs back into the users cache.
+    
+    Args:
+        cursor: Cursor inside the import transaction
+        new_users: Mapping of user_name to the team_id of the row it first appeared in
+        users_cache: Mapping of user_name to user_id, updated in place
+    """
+    if not new_users:
+        return
+    cursor.executemany('INSERT OR IGNORE INTO users (user_name, team_id) VALUES (?, ?)', new_users.items())
+    names = list(new_users)
+    for start in range(0, len(names), PARAMETER_CHUNK_SIZE):
+        chunk = names[start:start + PARAMETER_CHUNK_SIZE]
+        placeholders = ','.join('?' * len(chunk))
+        for user_id, user_name in cursor.execute(f'SELECT user_id, user_name FROM users WHERE user_name IN ({placeholders})', chunk):
+            users_cache[user_name] = user_id
+    logger.info(f"Created {len(new_users)} new users")
+
 def import_data(file_path=None):
     """Import data from CSV files in the cashbox directory"""
     init_db()
@@ -109,10 +307,10 @@ def import_data(file_path=None):
     # If specific file is provided, only process that file
     if file_path:
         file_type = None
-        pattern = re.compile(r'^cashbox-(dues|punishments|transactions)-')
         filename = os.path.basename(file_path)
-        if pattern.match(filename):
-            file_type = pattern.match(filename).group(1)  # dues, punishments, or transactions
+        match = FILE_PREFIX_PATTERN.match(filename)
+        if match:
+            file_type = match.group(1)  # dues, punishments, or transactions
         if not file_type:
             # Try to detect file type from content for non-standard filenames
             file_type = detect_file_type(file_path)
@@ -123,264 +321,201 @@ def import_data(file_path=None):
     else:
         files_to_process = get_files_to_import(cashbox_dir)
 
-    # Fix column names based on file type
-    column_mapping = {
-        'punishments': {
-            'penalty_created': 'created',
-            'penatly_created': 'created',  # Handle both spellings
-            'penalty_user': 'user',
-            'penatly_user': 'user',
-            'username': 'user',  # Map username to user
-            'penalty_reason': 'reason',
-            'penatly_reason': 'reason',
-            'penalty_name': 'reason',  # Map penalty_name to reason
-            'penalty_archived': 'archived',
-            'penatly_archived': 'archived',
-            'penalty_paid': 'paid_date',
-            'penatly_paid': 'paid_date',
-            'user_payment_date': 'paid_date',  # Add mapping for user_payment_date
-            'penalty_amount': 'amount',
-            'penatly_amount': 'amount',
-            'penalty_currency': 'currency',
-            'penatly_currency': 'currency',
-            'penalty_subject': 'subject',
-            'penatly_subject': 'subject'
-        },
-        'dues': {
-            'due_created': 'created',
-            'due_user': 'user',
-            'username': 'user',  # Map username to user
-            'due_reason': 'reason',
-            'due_name': 'reason',  # Map due_name to reason
-            'due_archived': 'archived',
-            'due_paid': 'paid_date',
-            'user_payment_date': 'paid_date',  # Add mapping for user_payment_date
-            'due_amount': 'amount',
-            'due_currency': 'currency',
-            'due_subject': 'subject'
-        },
-        'transactions': {
-            'transaction_created': 'created',
-            'transaction_user': 'user',
-            'username': 'user',  # Map username to user
-            'transaction_reason': 'reason',
-            'transaction_name': 'reason',  # Map transaction_name to reason
-            'transaction_amount': 'amount',
-            'transaction_currency': 'currency',
-            'transaction_subject': 'subject'
-        }
-    }
-
-    # Prepare queries for batch operations
-    due_query = '''
-        INSERT INTO dues (
-            user_id, team_id, due_created, due_reason,
-            due_archived, due_amount, due_currency, 
-            due_subject, search_params, due_paid_date, user_paid
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    '''
-    
-    punishment_query = '''
-        INSERT INTO punishments (
-            user_id, team_id, penalty_created, penalty_reason,
-            penalty_archived, penalty_amount, penalty_currency, 
-            penalty_subject, search_params, penalty_paid_date
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    '''
-    
-    transaction_query = '''
-        INSERT INTO transactions (
-            user_id, team_id, transaction_created, transaction_reason,
-            transaction_amount, transaction_currency, transaction_subject,
-            search_params
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    '''
-
     # Use a single connection for the entire import process
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute("PRAGMA cache_size = 10000")  # Increase cache size for performance
-        cursor.execute("BEGIN TRANSACTION")
+        # Take the write lock up front so a concurrent writer makes this wait
+        # at the start rather than failing the import halfway through
+        cursor.execute("BEGIN IMMEDIATE")
+        # Check foreign keys once at commit instead of on every row of the load
+        cursor.execute("PRAGMA defer_foreign_keys = ON")
         
-        # Cache users to avoid repeated lookups
-        users_cache = {}
-        cursor.execute('SELECT user_id, user_name FROM users')
-        for user_id, user_name in cursor.fetchall():
-            users_cache[user_name] = user_id
+        # Cache users to avoid repeated lookups, streaming rows straight from the cursor
+        users_cache = {user_name: user_id for user_id, user_name in cursor.execute('SELECT user_id, user_name FROM users')}
         
         # Cache teams
-        teams_map = {}
-        cursor.execute('SELECT team_id, team_name FROM teams')
-        for team_id, team_name in cursor.fetchall():
-            teams_map[team_id] = team_name
+        teams_map = {team_id: team_name for team_id, team_name in cursor.execute('SELECT team_id, team_name FROM teams')}
         
         total_processed = 0
+        today = datetime.now().strftime('%Y-%m-%d')
         
         for file_path, file_type in files_to_process:
             try:
                 # Truncate the corresponding table before importing new data
                 truncate_table(cursor, file_type)
+                # Build indexes once after the load instead of maintaining them per insert
+                index_statements = drop_table_indexes(cursor, file_type)
                 
-                with open(file_path, mode='r', encoding='utf-8-sig') as file:
-                    reader = csv.DictReader(file, delimiter=';')
-                    mapping = column_mapping[file_type]
+                with open_csv(file_path) as file:
+                    reader = csv.reader(file, delimiter=';')
+                    mapping = COLUMN_MAPPING[file_type]
+                    header = next(reader, [])
+                    
+                    # Resolve every column to its position once instead of
+                    # rebuilding a renamed dict for each row
+                    col_idx = {mapping.get(name, name): i for i, name in enumerate(header)}
+                    team_id_idx = col_idx['team_id']
+                    team_name_idx = col_idx['team_name']
+                    amount_idx = col_idx.get('amount')
+                    currency_idx = col_idx.get('currency')
+                    subject_idx = col_idx.get('subject')
+                    reason_idx = col_idx.get('reason')
+                    search_params_idx = col_idx.get('search_params')
+                    archived_idx = col_idx.get('archived')
+                    paid_date_idx = col_idx.get('paid_date')
+                    user_paid_idx = col_idx.get('user_paid')
+                    if file_type == 'transactions':
+                        created_idx = col_idx['transaction_date']
+                    else:
+                        created_idx = col_idx['created']
+                        user_idx = col_idx['user']
+                    # Punishments only take the paid date from the penalty columns,
+                    # preferring the misspelled export header
+                    penalty_paid_idxs = [header.index(name) for name in ('penatly_paid', 'penalty_paid') if name in header]
+                    
+                    # The insert statement and record layout are fixed for the whole file
+                    insert_query = INSERT_QUERIES[file_type]
+                    select_fields = RECORD_FIELDS[file_type]
                     
                     # Prepare batches for bulk inserts
                     batch_data = []
-                    batch_size = 1000  # Process 1000 rows at a time
+                    batch_size = 5000  # Process 5000 rows at a time
                     
                     # Keep track of processed rows for logging
                     processed_rows = 0
                     paid_items = 0
                     
-                    for row in reader:
+                    rows = [row for row in reader if row]
+                    
+                    # Resolve the team and user of every row up front so that all new
+                    # teams and users are created in bulk instead of one INSERT per row
+                    user_names = []
+                    new_teams = {}
+                    new_users = {}
+                    for row in rows:
                         try:
-                            fixed_row = {}
-                            for key, value in row.items():
-                                fixed_key = mapping.get(key, key)
-                                fixed_row[fixed_key] = value
-                            
-                            team_id = int(fixed_row['team_id'])
-                            team_name = fixed_row['team_name']
+                            team_id = int(row[team_id_idx])
+                        except ValueError as e:
+                            logger.error(f"Error importing row: {row}. Error: {e}")
+                            raise  # Re-raise to trigger rollback
+                        if team_id not in teams_map and team_id not in new_teams:
+                            new_teams[team_id] = row[team_name_idx]
+                        
+                        if file_type == 'transactions':
+                            # Transactions don't have a direct user field, so take it from the subject
+                            subject = row[subject_idx] if subject_idx is not None else ''
+                            # If we can't extract a user, use a placeholder
+                            user_name = extract_user_from_subject(subject) or "SYSTEM"
+                        else:
+                            user_name = row[user_idx]
+                        user_names.append(user_name)
+                        if user_name not in users_cache and user_name not in new_users:
+                            new_users[user_name] = team_id
+                    insert_new_teams(cursor, new_teams, teams_map)
+                    insert_new_users(cursor, new_users, users_cache)
+                    
+                    # Bind the lookups used on every row to locals
+                    append_record = batch_data.append
+                    get_user_id = users_cache.__getitem__
+                    to_iso_date = convert_date
+                    warn = logger.warning
+                    
+                    for row, user_name in zip(rows, user_names):
+                        try:
+                            team_id = int(row[team_id_idx])
+                            subject = row[subject_idx] if subject_idx is not None else ''
                             
-                            # Special handling for transactions which don't have a direct user field
                             if file_type == 'transactions':
-                                subject = fixed_row.get('transaction_subject', '')
-                                user_name = extract_user_from_subject(subject)
-                                if not user_name:
-                                    # If we can't extract a user, use a placeholder
-                                    user_name = "SYSTEM"
-                                created_date = datetime.strptime(fixed_row['transaction_date'], '%d-%m-%Y').strftime('%Y-%m-%d')
                                 # For transactions, use subject as reason if no specific reason field exists
-                                reason = fixed_row.get('transaction_reason', subject)
+                                reason = row[reason_idx] if reason_idx is not None else subject
                             else:
-                                user_name = fixed_row['user']
-                                created_date = datetime.strptime(fixed_row['created'], '%d-%m-%Y').strftime('%Y-%m-%d')
-                                reason = fixed_row.get('reason', '')
+                                reason = row[reason_idx] if reason_idx is not None else ''
+                            created_date = to_iso_date(row[created_idx])
                                 
-                            # Handle amount conversion
+                            # Amounts are exported as integer cents; parse them exactly and
+                            # convert to the currency unit the reporting scripts expect
+                            amount_value = row[amount_idx] if amount_idx is not None else '0'
                             try:
-                                amount = float(fixed_row.get('amount', fixed_row.get('transaction_amount', '0'))) / 100
+                                amount = int(amount_value) / 100
                             except ValueError:
-                                amount = 0.0
+                                # Cents written in decimal notation, as the importer always accepted
+                                try:
+                                    amount = float(amount_value) / 100
+                                except ValueError:
+                                    warn(f"Invalid amount {amount_value!r} in row {row}; importing it as 0")
+                                    amount = 0.0
                                 
-                            currency = fixed_row.get('currency', fixed_row.get('transaction_currency', 'EUR'))
-                            subject = fixed_row.get('subject', fixed_row.get('transaction_subject', ''))
-                            search_params = fixed_row.get('search_params', '')
+                            currency = row[currency_idx] if currency_idx is not None else 'EUR'
+                            search_params = row[search_params_idx] if search_params_idx is not None else ''
                             
                             # Handle paid_date and status for dues and punishments
                             paid_date = None
-                            if file_type in ['dues', 'punishments']:
-                                # For punishments, check if penatly_paid or penalty_paid contains a date
-                                if file_type == 'punishments':
-                                    # Get any field with "paid" in its name
-                                    paid_date_str = None
+                            if file_type == 'punishments':
+                                # Check both penatly_paid and penalty_paid fields
+                                paid_date_str = None
+                                for idx in penalty_paid_idxs:
+                                    if row[idx] and row[idx].strip():
+                                        paid_date_str = row[idx]
+                                        break
                                     
-                                    # Check both penatly_paid and penalty_paid fields
-                                    if 'penatly_paid' in row and row['penatly_paid'] and row['penatly_paid'].strip():
-                                        paid_date_str = row['penatly_paid']
-                                    elif 'penalty_paid' in row and row['penalty_paid'] and row['penalty_paid'].strip():
-                                        paid_date_str = row['penalty_paid']
-                                        
-                                    # Process the paid date if we have one
-                                    if paid_date_str:
-                                        try:
-                                            paid_date = datetime.strptime(paid_date_str, '%d-%m-%Y').strftime('%Y-%m-%d')
-                                            paid_items += 1
-                                        except ValueError:
-                                            logger.warning(f"Invalid date format for paid_date: {paid_date_str}")
-                                            paid_date = None
-                                else:
-                                    # For dues, use the payment_date and status logic
-                                    status = fixed_row.get('user_paid', '')
-                                    payment_date = fixed_row.get('user_payment_date', '')
-                                    
-                                    if payment_date:
-                                        try:
-                                            paid_date = datetime.strptime(payment_date, '%Y-%m-%d').strftime('%Y-%m-%d')
-                                        except ValueError:
-                                            paid_date = None
-                                    
-                                    paid_date = convert_payment_status(status, paid_date)
+                                # Process the paid date if we have one
+                                if paid_date_str:
+                                    try:
+                                        paid_date = to_iso_date(paid_date_str)
+                                        paid_items += 1
+                                    except ValueError:
+                                        warn(f"Invalid date format for paid_date: {paid_date_str}")
+                                        paid_date = None
+                            elif file_type == 'dues':
+                                # For dues, use the payment_date and status logic
+                                status = row[user_paid_idx] if user_paid_idx is not None else ''
+                                payment_date = row[paid_date_idx] if paid_date_idx is not None else ''
+                                
+                                if payment_date:
+                                    try:
+                                        paid_date = to_iso_date(payment_date, '%Y-%m-%d')
+                                    except ValueError:
+                                        paid_date = None
+                                
+                                # Exempt dues count as settled (defaulting to today) but keep their status
+                                if status == "STATUS_EXEMPT":
+                                    paid_date = paid_date or today
+                                elif status != "STATUS_PAID":
+                                    paid_date = None
                                     
                             # Handle archived field for dues and punishments
                             archived = None
                             if file_type in ['dues', 'punishments']:
-                                archived_value = fixed_row.get('archived', '')
+                                archived_value = row[archived_idx] if archived_idx is not None else ''
                                 archived = 1 if archived_value and archived_value.upper() == 'YES' else 0
                                 
-                            # Ensure team exists
-                            if team_id not in teams_map:
-                                cursor.execute('INSERT OR IGNORE INTO teams (team_id, team_name) VALUES (?, ?)', 
-                                             (team_id, team_name))
-                                teams_map[team_id] = team_id
-                            
-                            # Handle user creation/lookup more efficiently using the cache
-                            if user_name in users_cache:
-                                user_id = users_cache[user_name]
-                            else:
-                                # User not in cache, look up in database
-                                cursor.execute('SELECT user_id FROM users WHERE user_name = ?', (user_name,))
-                                existing_user = cursor.fetchone()
-                                
-                                if existing_user:
-                                    user_id = existing_user[0]
-                                    users_cache[user_name] = user_id  # Update cache
-                                else:
-                                    # Create user with auto-generated ID
-                                    cursor.execute('INSERT INTO users (user_name, team_id) VALUES (?, ?)', 
-                                                (user_name, team_id))
-                                    user_id = cursor.lastrowid
-                                    users_cache[user_name] = user_id
+                            # All users of this file were resolved before the row loop
+                            user_id = get_user_id(user_name)
                             
-                            # Prepare data for batch insert based on file type
-                            if file_type == 'dues':
-                                batch_data.append((
-                                    user_id, team_id, created_date, reason,
-                                    archived, amount, currency, subject,
-                                    search_params, paid_date, fixed_row.get('user_paid', 'STATUS_UNPAID')
-                                ))
-                            elif file_type == 'punishments':
-                                batch_data.append((
-                                    user_id, team_id, created_date, reason,
-                                    archived, amount, currency, subject,
-                                    search_params, paid_date
-                                ))
-                            else:  # transactions
-                                batch_data.append((
-                                    user_id, team_id, created_date, reason,
-                                    amount, currency, subject, search_params
-                                ))
+                            user_paid = row[user_paid_idx] if user_paid_idx is not None else 'STATUS_UNPAID'
+                            append_record(select_fields((
+                                user_id, team_id, created_date, reason,
+                                archived, amount, currency, subject,
+                                search_params, paid_date, user_paid
+                            )))
                             
                             processed_rows += 1
                             
                             # Process in batches for better performance
                             if len(batch_data) >= batch_size:
-                                if file_type == 'dues':
-                                    process_batch(cursor, batch_data, due_query)
-                                elif file_type == 'punishments':
-                                    process_batch(cursor, batch_data, punishment_query)
-                                else:  # transactions
-                                    process_batch(cursor, batch_data, transaction_query)
-                                batch_data = []
+                                process_batch(cursor, batch_data, insert_query)
+                                batch_data.clear()
                                 
                         except Exception as e:
                             logger.error(f"Error importing row: {row}. Error: {e}")
                             raise  # Re-raise to trigger rollback
                     
                     # Process any remaining rows in the batch
-                    if batch_data:
-                        if file_type == 'dues':
-                            process_batch(cursor, batch_data, due_query)
-                        elif file_type == 'punishments':
-                            process_batch(cursor, batch_data, punishment_query)
-                        else:  # transactions
-                            process_batch(cursor, batch_data, transaction_query)
+                    process_batch(cursor, batch_data, insert_query)
+                    
+                    restore_table_indexes(cursor, index_statements)
                     
                     logger.info(f"Processed {processed_rows} rows from {file_path}")
                     logger.info(f"Found {paid_items} paid items in {file_path}")
@@ -414,6 +549,9 @@ def import_data(file_path=None):
         conn.commit()
         logger.info(f"Successfully imported {total_processed} records in total")
         
+        # Refresh planner statistics for the freshly loaded tables, with bounded cost
+        conn.executescript("PRAGMA analysis_limit = 400; PRAGMA optimize;")
+        
     except Exception as e:
         logger.error(f"Transaction failed: {e}")
         conn.rollback()
@@ -1,8 +1,22 @@
+import atexit
+import importlib
 import sqlite3
 import logging
 import os
+import threading
+from contextlib import closing
+from functools import lru_cache
+from typing import Optional
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+
+__all__ = [
+    "Base", "SQLITE_PRAGMAS", "SQLITE_MIGRATIONS",
+    "configure_connection", "get_engine", "get_session", "get_db",
+    "get_db_path", "get_db_connection", "optimize_connection", "close_db_connections",
+    "apply_sqlite_migrations", "create_database",
+    "User", "Penalty", "Transaction", "AuditLog",
+]
 
 class Base(DeclarativeBase):
     """Base class for all SQLAlchemy models"""
@@ -10,31 +24,91 @@ class Base(DeclarativeBase):
 
 engine = None
 SessionLocal = None
+# Guards the lazy creation of engine and SessionLocal, so concurrent first
+# requests in a threaded server can't each build their own
+_init_lock = threading.Lock()
+
+# Applied to every new SQLite connection: WAL lets readers run alongside the
+# writer and NORMAL sync drops the per-commit fsync of the rollback journal.
+# busy_timeout makes a writer wait for the lock instead of failing at once.
+# page_size only applies to a database created by this connection, so it
+# comes first; existing files keep their page size.
+SQLITE_PRAGMAS = (
+    "PRAGMA page_size=8192",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Compiled SQL cache entries per engine; SQLAlchemy's default is 500
+QUERY_CACHE_SIZE = 1200
+
+def configure_connection(dbapi_connection, connection_record=None):
+    """
+    Apply SQLITE_PRAGMAS to a new SQLite connection.
+    
+    Also usable as a SQLAlchemy "connect" event listener.
+    """
+    for pragma in SQLITE_PRAGMAS:
+        dbapi_connection.execute(pragma)
+
+def _engine_options(settings) -> dict:
+    """Connection and pool arguments for create_engine based on the database URL"""
+    url = settings.DATABASE_URL
+    if url.startswith("sqlite"):
+        options = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" not in url and url not in ("sqlite://", "sqlite:///"):
+            # Local file connections don't go stale, so skip pre-ping and recycling
+            options.update(pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW)
+        return options
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_PRE_PING,
+    }
 
 def get_engine():
     """Get or create SQLAlchemy engine"""
     global engine
-    if engine is None:
-        from app.config.settings import get_settings
-        settings = get_settings()
-        
-        # Ensure database directory exists for SQLite
-        if not settings.DATABASE_URL.startswith("sqlite:///:memory:"):
-            db_dir = os.path.dirname(settings.DATABASE_URL.replace('sqlite:///', ''))
-            os.makedirs(db_dir, exist_ok=True)
-        
-        engine = create_engine(
-            settings.DATABASE_URL,
-            connect_args={"check_same_thread": False}
-        )
+    if engine is not None:
+        return engine
+    with _init_lock:
+        if engine is None:
+            from app.config.settings import get_settings
+            settings = get_settings()
+            
+            # Ensure database directory exists for SQLite
+            if not settings.DATABASE_URL.startswith("sqlite:///:memory:"):
+                db_dir = os.path.dirname(settings.DATABASE_URL.replace('sqlite:///', ''))
+                os.makedirs(db_dir, exist_ok=True)
+            
+            new_engine = create_engine(
+                settings.DATABASE_URL,
+                echo=settings.DEBUG,  # Only log every SQL statement when debugging
+                query_cache_size=QUERY_CACHE_SIZE,
+                **_engine_options(settings)
+            )
+            if settings.DATABASE_URL.startswith("sqlite"):
+                event.listen(new_engine, "connect", configure_connection)
+            engine = new_engine
     return engine
 
 def get_session():
     """Get SQLAlchemy session maker"""
     global SessionLocal
-    if SessionLocal is None:
-        engine = get_engine()
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    if SessionLocal is not None:
+        return SessionLocal
+    bind = get_engine()
+    with _init_lock:
+        if SessionLocal is None:
+            # Objects keep their committed state, so crud helpers can return them
+            # without a refresh SELECT after every commit
+            SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=bind)
     return SessionLocal
 
 def get_db():
@@ -46,67 +120,261 @@ def get_db():
     finally:
         db.close()
 
-# Import these after Base is defined to avoid circular imports
-from app.database.models import User, Penalty, Transaction, AuditLog
-from app.database.crud import *
+# Direct sqlite3 connections, one per thread, reused across calls
+_thread_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def get_db_path() -> str:
+    """Resolve the SQLite database file from the DATABASE_URL setting once"""
+    from app.config.settings import get_settings
+    db_url = get_settings().DATABASE_URL
+    
+    if db_url.startswith('sqlite:///'):
+        db_path = db_url.replace('sqlite:///', '')
+        if db_path != ':memory:' and not os.path.isabs(db_path):
+            db_path = os.path.join(os.getcwd(), db_path)
+        return db_path
+    
+    logger.warning(f"Unrecognized database URL format: {db_url}, using default location")
+    return os.path.join(os.getcwd(), 'database', 'penalties.db')
+
+def _is_open(conn: sqlite3.Connection) -> bool:
+    """Check whether a caller has closed a shared connection"""
+    try:
+        conn.total_changes
+        return True
+    except sqlite3.ProgrammingError:
+        return False
+
+def get_db_connection() -> sqlite3.Connection:
+    """
+    Get the calling thread's direct SQLite connection.
+    
+    The connection is opened on first use and reused by later calls from the
+    same thread, so the database file and its header are only read once. A new
+    connection is opened after a fork or if the previous one was closed.
+    
+    Returns:
+        sqlite3.Connection: A connection to the database with row factory set
+    """
+    conn = getattr(_thread_local, "conn", None)
+    pid = os.getpid()
+    if conn is None or _thread_local.pid != pid or not _is_open(conn):
+        stale = conn
+        conn = sqlite3.connect(get_db_path(), check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        configure_connection(conn)
+        _thread_local.conn = conn
+        _thread_local.pid = pid
+        with _connections_lock:
+            if stale in _connections:
+                _connections.remove(stale)
+            _connections.append(conn)
+    return conn
+
+def optimize_connection(conn: sqlite3.Connection) -> None:
+    """Let SQLite refresh planner statistics for tables that need it before closing"""
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error as e:
+        logger.warning(f"PRAGMA optimize failed: {e}")
+
+@atexit.register
+def close_db_connections() -> None:
+    """Close every connection handed out by get_db_connection"""
+    with _connections_lock:
+        while _connections:
+            conn = _connections.pop()
+            if _is_open(conn):
+                optimize_connection(conn)
+            conn.close()
+
+# The ORM models and crud helpers are re-exported lazily, so scripts that only
+# need the direct sqlite3 helpers don't pay for importing them
+_MODEL_EXPORTS = frozenset({"User", "Penalty", "Transaction", "AuditLog"})
+_CRUD_EXPORTS = frozenset({
+    "get_user", "get_user_by_email", "get_user_by_name", "get_users", "get_users_strict", "get_users_lite",
+    "create_user", "update_user", "delete_user",
+    "get_penalty", "get_penalties", "get_penalties_lite", "get_user_penalties", "iter_user_penalties",
+    "create_penalty", "create_penalties_bulk", "update_penalty", "mark_penalty_as_paid",
+    "delete_penalty", "pay_penalty", "get_penalties_summary", "get_user_penalties_summary",
+    "get_user_balance", "invalidate_penalty_cache",
+    "create_transaction", "get_transaction", "get_user_transactions", "iter_user_transactions",
+    "create_audit_log", "create_audit_logs_bulk", "get_audit_logs",
+})
+
+def __getattr__(name: str):
+    """Resolve model classes and crud functions on first access"""
+    if name in _MODEL_EXPORTS:
+        return getattr(importlib.import_module("app.database.models"), name)
+    if name in _CRUD_EXPORTS:
+        return getattr(importlib.import_module("app.database.crud"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def create_database(db_path: str):
+# Migrations for the direct SQLite schema as (user_version, table, column,
+# statements). A database that already has the column was migrated before
+# versions were tracked, so only its version number is recorded. Entries
+# without a column only create indexes and always run. A migration whose
+# table doesn't exist is skipped for good: create_database builds penalties
+# in its final shape, and the cashbox tables are migrated on the databases
+# that already hold them.
+SQLITE_MIGRATIONS = (
+    (1, "penalties", "search_params", (
+        """
+        ALTER TABLE penalties
+        ADD COLUMN search_params TEXT CHECK(search_params IS NULL OR length(search_params) <= 500)
+        """,
+    )),
+    (2, "dues", "user_paid", (
+        """
+        ALTER TABLE dues
+        ADD COLUMN user_paid TEXT
+        CHECK(user_paid IN ('STATUS_PAID', 'STATUS_UNPAID', 'STATUS_EXEMPT') OR user_paid IS NULL)
+        """,
+        """
+        UPDATE dues
+        SET user_paid = CASE
+            WHEN due_paid_date IS NOT NULL THEN 'STATUS_PAID'
+            ELSE 'STATUS_UNPAID'
+        END
+        """,
+    )),
+    # Covering indexes for the per-user open items and recent transactions,
+    # which filter on user and paid date and sort by creation date. One
+    # migration per table, so each only waits for its own table.
+    (3, "punishments", None, (
+        """
+        CREATE INDEX IF NOT EXISTS idx_punishments_user_paid
+        ON punishments(user_id, penalty_paid_date, penalty_created)
+        """,
+    )),
+    (4, "dues", None, (
+        """
+        CREATE INDEX IF NOT EXISTS idx_dues_user_paid
+        ON dues(user_id, due_paid_date, user_paid, due_created)
+        """,
+    )),
+    (5, "transactions", None, (
+        """
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_created
+        ON transactions(user_id, transaction_created)
+        """,
+    )),
+)
+
+def apply_sqlite_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Apply pending SQLITE_MIGRATIONS in a single transaction.
+    
+    An up-to-date database costs one PRAGMA user_version read. Migrations on
+    tables the database doesn't have are skipped, and user_version still
+    advances past them so later calls don't check them again.
+    
+    Returns:
+        int: The schema version after migrating
+    """
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    pending = [migration for migration in SQLITE_MIGRATIONS if migration[0] > current]
+    if not pending:
+        return current
+    
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.execute("BEGIN")
+    try:
+        for version, table, column, statements in pending:
+            if table not in tables:
+                logger.info(f"Skipping migration {version}: {table} table does not exist")
+                continue
+            if column is None:
+                logger.info(f"Applying migration {version} to {table} table")
+                run = True
+            else:
+                run = column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if run:
+                    logger.info(f"Adding {column} column to {table} table")
+            if run:
+                for statement in statements:
+                    conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {pending[-1][0]}")
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return pending[-1][0]
+
+# Direct SQLite schema, created in one executescript batch by create_database
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS teams (
+        team_id INTEGER PRIMARY KEY,
+        team_name TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_name TEXT NOT NULL,
+        team_id INTEGER,
+        FOREIGN KEY (team_id) REFERENCES teams(team_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS penalties (
+        penalty_id TEXT PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        team_id INTEGER NOT NULL,
+        penalty_created TEXT NOT NULL,
+        penalty_reason TEXT NOT NULL,
+        penalty_archived TEXT NOT NULL,
+        penalty_amount REAL NOT NULL,
+        penalty_currency TEXT NOT NULL,
+        penalty_subject TEXT,
+        search_params TEXT,
+        penalty_paid_date TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(user_id),
+        FOREIGN KEY (team_id) REFERENCES teams(team_id)
+    )
+    """,
+    # Indexes for the per-user and open-penalty lookups
+    "CREATE INDEX IF NOT EXISTS idx_penalties_user ON penalties(user_id)",
+    """
+    CREATE INDEX IF NOT EXISTS idx_penalties_user_unpaid
+    ON penalties(user_id) WHERE penalty_paid_date IS NULL
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS logs (
+        log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        log_timestamp TEXT,
+        log_action TEXT,
+        log_details TEXT,
+        user_id INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_logs_user ON logs(user_id)",
+)
+
+def create_database(db_path: Optional[str] = None):
+    """
+    Create the direct SQLite tables if they don't exist.
+    
+    Args:
+        db_path: Path to the database file. Defaults to the DATABASE_URL setting.
+    """
+    if db_path is None:
+        db_path = get_db_path()
     try:
         # Ensure the directory exists
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS teams (
-            team_id INTEGER PRIMARY KEY,
-            team_name TEXT NOT NULL
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_name TEXT NOT NULL,
-            team_id INTEGER,
-            FOREIGN KEY (team_id) REFERENCES teams(team_id)
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS penalties (
-            penalty_id TEXT PRIMARY KEY,
-            user_id INTEGER NOT NULL,
-            team_id INTEGER NOT NULL,
-            penalty_created TEXT NOT NULL,
-            penalty_reason TEXT NOT NULL,
-            penalty_archived TEXT NOT NULL,
-            penalty_amount REAL NOT NULL,
-            penalty_currency TEXT NOT NULL,
-            penalty_subject TEXT,
-            search_params TEXT,
-            penalty_paid_date TEXT,
-            FOREIGN KEY (user_id) REFERENCES users(user_id),
-            FOREIGN KEY (team_id) REFERENCES teams(team_id)
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS logs (
-            log_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            log_timestamp TEXT,
-            log_action TEXT,
-            log_details TEXT,
-            user_id INTEGER
-        )
-        ''')
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
 
-        conn.commit()
-        conn.close()
+        with closing(sqlite3.connect(db_path)) as conn:
+            configure_connection(conn)
+            conn.executescript("BEGIN;\n" + ";\n".join(_SCHEMA) + ";\nCOMMIT;")
+            optimize_connection(conn)
         logger.info(f"Database created successfully at {db_path}")
     except sqlite3.Error as e:
         logger.error(f"SQLite error: {e}")
@@ -1,39 +1,106 @@
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm import Session, selectinload, raiseload
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Iterator, Tuple
+import threading
+import time
 import uuid
 
 from app.database import models, schemas
 from app.utils.logging_config import get_logger
-from sqlalchemy import desc, or_, and_, func
+from sqlalchemy import desc, or_, and_, func, select, bindparam, insert, update, delete, case, Row
 from app.config.settings import get_settings
+from app.utils.helpers import generate_uuids
 from app.errors.exceptions import ResourceNotFoundException, DatabaseError
 
+__all__ = [
+    "get_user", "get_user_by_email", "get_user_by_name", "get_users", "get_users_strict", "get_users_lite",
+    "create_user", "update_user", "delete_user",
+    "get_penalty", "get_penalties", "get_penalties_lite", "get_user_penalties", "iter_user_penalties",
+    "create_penalty", "create_penalties_bulk", "update_penalty", "mark_penalty_as_paid",
+    "delete_penalty", "pay_penalty", "get_penalties_summary", "get_user_penalties_summary",
+    "get_user_balance", "invalidate_penalty_cache",
+    "create_transaction", "get_transaction", "get_user_transactions", "iter_user_transactions",
+    "create_audit_log", "create_audit_logs_bulk", "get_audit_logs",
+]
+
 settings = get_settings()
-_SessionLocal = None
 
 logger = get_logger(__name__)
 
-def get_db():
-    """Get database session"""
-    global _SessionLocal
-    if _SessionLocal is None:
-        from app.database.models import get_engine
-        engine = get_engine()
-        _SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Prebuilt statements for the hot single-row lookups. Building them once lets
+# every call reuse the same statement object and its cached compiled SQL.
+# Primary key lookups use Session.get, which checks the identity map first.
+_GET_USER_BY_EMAIL = select(models.User).where(models.User.email == bindparam("email")).limit(1)
+_GET_USER_BY_NAME = select(models.User).where(models.User.name == bindparam("name")).limit(1)
+
+# All four penalty totals computed in one scan of the penalties table
+_PENALTIES_SUMMARY = select(
+    func.count(),
+    func.coalesce(func.sum(case((models.Penalty.paid == True, 1), else_=0)), 0),
+    func.sum(models.Penalty.amount),
+    func.sum(case((models.Penalty.paid == True, models.Penalty.amount), else_=0))
+).select_from(models.Penalty)
+# The per-user variant also reports whether the user exists, so a user
+# without penalties can be told apart from a missing one in the same query
+_USER_PENALTIES_SUMMARY = _PENALTIES_SUMMARY.add_columns(
+    select(models.User.id).where(models.User.id == bindparam("user_id")).exists()
+).where(models.Penalty.user_id == bindparam("user_id"))
+
+# Row inserts that bypass the unit of work; call db.execute(stmt, rows) with a
+# list of dicts to get a single executemany. Built once and shared, so every
+# call reuses the engine's cached compiled form.
+_PENALTY_INSERT = insert(models.Penalty)
+_TRANSACTION_INSERT = insert(models.Transaction)
+_AUDIT_LOG_INSERT = insert(models.AuditLog)
+
+# Columns that update_user / update_penalty accept from callers. Relationship
+# names and other non-column attributes are dropped, as are the primary keys.
+_USER_UPDATABLE = frozenset(models.User.__table__.columns.keys()) - {"id"}
+_PENALTY_UPDATABLE = frozenset(models.Penalty.__table__.columns.keys()) - {"penalty_id"}
+
+# Short-lived cache for the penalty aggregates. Every penalty write bumps the
+# epoch, which is part of the cache key, so stale totals are never served.
+_CACHE_TTL = 60.0
+_CACHE_MAX_ENTRIES = 1024
+_cache: Dict[Tuple, Tuple[float, Any]] = {}
+_cache_lock = threading.Lock()
+_penalty_epoch = 0
+
+def _cached(db: Session, key: Tuple, compute: Callable[[], Any], ttl: float = _CACHE_TTL) -> Any:
+    """Return a cached value for key on this database, computing it when missing or expired"""
+    full_key = (str(db.get_bind().url), _penalty_epoch) + key
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(full_key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
     
-    db = _SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    value = compute()
+    with _cache_lock:
+        if len(_cache) >= _CACHE_MAX_ENTRIES:
+            _cache.clear()
+        _cache[full_key] = (now + ttl, value)
+    return value
+
+def invalidate_penalty_cache() -> None:
+    """
+    Drop cached penalty aggregates after a penalty write.
+    
+    The crud write functions call this themselves; code that writes penalties
+    through its own session must call it after committing.
+    """
+    global _penalty_epoch
+    with _cache_lock:
+        _penalty_epoch += 1
+        _cache.clear()
 
 # User operations
-def get_user(db: Session, user_id: str) -> Optional[models.User]:
-    """Get a user by ID with error handling"""
+def get_user(db: Session, user_id: str, load_penalties: bool = False) -> Optional[models.User]:
+    """Get a user by ID with error handling, optionally loading their penalties too"""
     try:
-        user = db.query(models.User).filter(models.User.id == user_id).first()
+        options = [selectinload(models.User.penalties)] if load_penalties else None
+        user = db.get(models.User, user_id, options=options)
         if not user:
             raise ResourceNotFoundException(f"User {user_id} not found")
         return user
@@ -43,16 +110,59 @@ def get_user(db: Session, user_id: str) -> Optional[models.User]:
 
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
     """Get a user by email"""
-    return db.query(models.User).filter(models.User.email == email).first()
+    return db.execute(_GET_USER_BY_EMAIL, {"email": email}).scalars().first()
 
 def get_user_by_name(db: Session, name: str) -> Optional[models.User]:
     """Get a user by name"""
-    return db.query(models.User).filter(models.User.name == name).first()
+    return db.execute(_GET_USER_BY_NAME, {"name": name}).scalars().first()
+
+def get_users(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    search: Optional[str] = None,
+    load_penalties: bool = False,
+    after_id: Optional[str] = None,
+    with_totals: bool = False
+) -> List[models.User]:
+    """
+    Get a list of users ordered by ID, with optional search and pagination.
+    
+    Pass the last user ID of the previous page as after_id to page by key;
+    unlike skip, the database then doesn't have to step over earlier rows.
+    With load_penalties, every user's penalties are fetched in one extra
+    SELECT ... WHERE user_id IN (...) instead of one query per user on access.
+    With with_totals, only their paid and unpaid sums are, in one grouped query.
+    """
+    try:
+        query = db.query(models.User).order_by(models.User.id)
+        if after_id is not None:
+            query = query.filter(models.User.id > after_id)
+        if load_penalties:
+            query = query.options(selectinload(models.User.penalties))
+        if search:
+            search_term = f"%{search}%"
+            query = query.filter(
+                (models.User.name.ilike(search_term)) | 
+                (models.User.email.ilike(search_term))
+            )
+        users = query.offset(skip).limit(limit).all()
+        if with_totals:
+            models.User.load_penalty_totals(db, users)
+        return users
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while fetching users: {str(e)}")
+        raise DatabaseError(f"Error fetching users: {str(e)}")
 
-def get_users(db: Session, skip: int = 0, limit: int = 100, search: Optional[str] = None) -> List[models.User]:
-    """Get a list of users with optional search and pagination"""
+def get_users_strict(db: Session, skip: int = 0, limit: int = 100, search: Optional[str] = None) -> List[models.User]:
+    """
+    Like get_users with load_penalties, but any other relationship access raises
+    instead of lazily issuing a query, so N+1 patterns fail fast in tests.
+    """
     try:
-        query = db.query(models.User)
+        query = db.query(models.User).options(
+            selectinload(models.User.penalties), raiseload("*")
+        )
         if search:
             search_term = f"%{search}%"
             query = query.filter(
@@ -64,20 +174,30 @@ def get_users(db: Session, skip: int = 0, limit: int = 100, search: Optional[str
         logger.error(f"Database error while fetching users: {str(e)}")
         raise DatabaseError(f"Error fetching users: {str(e)}")
 
+def get_users_lite(db: Session, skip: int = 0, limit: int = 100) -> List[Row]:
+    """
+    Get users as plain (id, name, email) rows ordered by ID.
+    
+    For listings that only display these fields; no ORM objects are built.
+    """
+    return db.execute(
+        select(models.User.id, models.User.name, models.User.email)
+        .order_by(models.User.id)
+        .offset(skip).limit(limit)
+    ).all()
+
 def create_user(db: Session, user: schemas.UserCreate) -> models.User:
     """Create a new user with transaction management"""
     try:
+        now = datetime.utcnow()
         db_user = models.User(
+            **user.model_dump(),
             id=str(uuid.uuid4()),
-            name=user.name,
-            email=user.email,
-            phone=user.phone,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
+            created_at=now,
+            updated_at=now
         )
         db.add(db_user)
         db.commit()
-        db.refresh(db_user)
         logger.info(f"Created new user: {db_user.name} (ID: {db_user.id})")
         return db_user
     except IntegrityError as e:
@@ -91,45 +211,95 @@ def create_user(db: Session, user: schemas.UserCreate) -> models.User:
 
 def update_user(db: Session, user_id: str, user_data: Dict[str, Any]) -> Optional[models.User]:
     """Update an existing user"""
-    db_user = get_user(db, user_id)
-    if not db_user:
-        return None
+    try:
+        values = {key: value for key, value in user_data.items() if key in _USER_UPDATABLE}
+        values["updated_at"] = datetime.utcnow()
         
-    for key, value in user_data.items():
-        if hasattr(db_user, key) and key != 'id':  # Don't update ID
-            setattr(db_user, key, value)
-            
-    db_user.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(db_user)
-    logger.info(f"Updated user: {db_user.name} (ID: {db_user.id})")
-    return db_user
+        # UPDATE ... RETURNING: one statement instead of a SELECT followed by an UPDATE
+        db_user = db.execute(
+            update(models.User).where(models.User.id == user_id).values(**values).returning(models.User)
+        ).scalar_one_or_none()
+        if db_user is None:
+            db.rollback()
+            raise ResourceNotFoundException(f"User {user_id} not found")
+        db.commit()
+        logger.info(f"Updated user: {db_user.name} (ID: {db_user.id})")
+        return db_user
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Database error while updating user: {str(e)}")
+        raise DatabaseError(f"Error updating user: {str(e)}")
 
 def delete_user(db: Session, user_id: str) -> bool:
     """Delete a user"""
-    db_user = get_user(db, user_id)
-    if not db_user:
-        return False
-        
-    db.delete(db_user)
-    db.commit()
-    logger.info(f"Deleted user with ID: {user_id}")
-    return True
+    try:
+        # Delete the user's rows directly instead of loading them for the ORM cascade
+        db.execute(delete(models.Penalty).where(models.Penalty.user_id == user_id))
+        db.execute(delete(models.Transaction).where(models.Transaction.user_id == user_id))
+        result = db.execute(delete(models.User).where(models.User.id == user_id))
+        if result.rowcount == 0:
+            db.rollback()
+            raise ResourceNotFoundException(f"User {user_id} not found")
+        db.commit()
+        invalidate_penalty_cache()  # The user's penalties are deleted with them
+        logger.info(f"Deleted user with ID: {user_id}")
+        return True
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Database error while deleting user: {str(e)}")
+        raise DatabaseError(f"Error deleting user: {str(e)}")
 
 # Penalty operations
 def get_penalty(db: Session, penalty_id: str) -> Optional[models.Penalty]:
     """Get a penalty by ID"""
-    return db.query(models.Penalty).filter(models.Penalty.penalty_id == penalty_id).first()
+    return db.get(models.Penalty, penalty_id)
 
-def get_penalties(db: Session, skip: int = 0, limit: int = 100, paid: Optional[bool] = None) -> List[models.Penalty]:
-    """Get a list of penalties with optional filtering and pagination"""
-    query = db.query(models.Penalty)
+def get_penalties(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    paid: Optional[bool] = None,
+    after_id: Optional[str] = None
+) -> List[models.Penalty]:
+    """
+    Get a list of penalties ordered by ID, with optional filtering and pagination.
     
+    Pass the last penalty ID of the previous page as after_id to page by key
+    instead of skipping rows.
+    """
+    query = db.query(models.Penalty).order_by(models.Penalty.penalty_id)
+    
+    if after_id is not None:
+        query = query.filter(models.Penalty.penalty_id > after_id)
     if paid is not None:
         query = query.filter(models.Penalty.paid == paid)
         
     return query.offset(skip).limit(limit).all()
 
+def get_penalties_lite(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    paid: Optional[bool] = None
+) -> List[Row]:
+    """
+    Get penalties as plain (penalty_id, user_id, user_name, amount, reason, paid)
+    rows ordered by ID, with the user name joined in instead of a lookup per row.
+    """
+    query = select(
+        models.Penalty.penalty_id,
+        models.Penalty.user_id,
+        models.User.name.label("user_name"),
+        models.Penalty.amount,
+        models.Penalty.reason,
+        models.Penalty.paid
+    ).outerjoin(models.User, models.User.id == models.Penalty.user_id)
+    
+    if paid is not None:
+        query = query.where(models.Penalty.paid == paid)
+    
+    return db.execute(query.order_by(models.Penalty.penalty_id).offset(skip).limit(limit)).all()
+
 def get_user_penalties(db: Session, user_id: str, include_paid: bool = True) -> List[models.Penalty]:
     """Get penalties for a specific user"""
     query = db.query(models.Penalty).filter(models.Penalty.user_id == user_id)
@@ -139,36 +309,48 @@ def get_user_penalties(db: Session, user_id: str, include_paid: bool = True) ->
         
     return query.all()
 
+def iter_user_penalties(db: Session, user_id: str, include_paid: bool = True, batch_size: int = 256) -> Iterator[models.Penalty]:
+    """Stream a user's penalties in batches instead of loading them all at once"""
+    query = db.query(models.Penalty).filter(models.Penalty.user_id == user_id)
+    
+    if not include_paid:
+        query = query.filter(models.Penalty.paid == False)
+        
+    return iter(query.yield_per(batch_size))
+
 def create_penalty(db: Session, penalty: schemas.PenaltyCreate) -> models.Penalty:
     """Create a new penalty with transaction management"""
     try:
         # Verify user exists first
         user = get_user(db, penalty.user_id)
         
+        now = datetime.utcnow()
+        data = penalty.model_dump()
+        data["amount"] = float(data["amount"])
+        data["date"] = data["date"] or now
         db_penalty = models.Penalty(
+            **data,
             penalty_id=str(uuid.uuid4()),
-            user_id=penalty.user_id,
-            amount=penalty.amount,
-            reason=penalty.reason,
-            date=penalty.date or datetime.utcnow(),
             paid=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
+            created_at=now,
+            updated_at=now
         )
         db.add(db_penalty)
         
-        # Create audit log
-        audit_log = models.AuditLog(
-            action="create_penalty",
-            entity_type="penalty",
-            entity_id=db_penalty.penalty_id,
-            user_id=penalty.user_id,
-            details=f"Created penalty of {penalty.amount} for user {penalty.user_id}"
-        )
-        db.add(audit_log)
+        # Create audit log; nothing reads it back, so it goes out as a plain
+        # INSERT instead of an ORM object for the flush to track
+        db.execute(_AUDIT_LOG_INSERT, [{
+            "log_id": str(uuid.uuid4()),
+            "action": "create_penalty",
+            "entity_type": "penalty",
+            "entity_id": db_penalty.penalty_id,
+            "user_id": penalty.user_id,
+            "details": f"Created penalty of {penalty.amount} for user {penalty.user_id}",
+            "timestamp": now,
+        }])
         
         db.commit()
-        db.refresh(db_penalty)
+        invalidate_penalty_cache()
         logger.info(f"Created new penalty for user {penalty.user_id}: {db_penalty.penalty_id}")
         return db_penalty
     except ResourceNotFoundException:
@@ -179,61 +361,134 @@ def create_penalty(db: Session, penalty: schemas.PenaltyCreate) -> models.Penalt
         logger.error(f"Database error while creating penalty: {str(e)}")
         raise DatabaseError(f"Error creating penalty: {str(e)}")
 
+def create_penalties_bulk(db: Session, penalties: List[schemas.PenaltyCreate]) -> List[models.Penalty]:
+    """Create several penalties and their audit logs in a single transaction"""
+    if not penalties:
+        return []
+    try:
+        # Verify all referenced users exist with one query
+        user_ids = {penalty.user_id for penalty in penalties}
+        found = set(db.execute(select(models.User.id).where(models.User.id.in_(user_ids))).scalars())
+        missing = user_ids - found
+        if missing:
+            raise ResourceNotFoundException(f"User {sorted(missing)[0]} not found")
+
+        now = datetime.utcnow()
+        # Penalty and audit log ids for the whole batch from one urandom read
+        ids = iter(generate_uuids(2 * len(penalties)))
+        penalty_rows = []
+        audit_rows = []
+        for penalty in penalties:
+            penalty_id = next(ids)
+            penalty_rows.append({
+                "penalty_id": penalty_id,
+                "user_id": penalty.user_id,
+                "amount": float(penalty.amount),
+                "reason": penalty.reason,
+                "date": penalty.date or now,
+                "paid": False,
+                "created_at": now,
+                "updated_at": now
+            })
+            audit_rows.append({
+                "log_id": next(ids),
+                "action": "create_penalty",
+                "entity_type": "penalty",
+                "entity_id": penalty_id,
+                "user_id": penalty.user_id,
+                "details": f"Created penalty of {penalty.amount} for user {penalty.user_id}",
+                "timestamp": now
+            })
+
+        # executemany inserts, committed once for the whole batch
+        db.execute(_PENALTY_INSERT, penalty_rows)
+        db.execute(_AUDIT_LOG_INSERT, audit_rows)
+        db.commit()
+        invalidate_penalty_cache()
+
+        penalty_ids = [row["penalty_id"] for row in penalty_rows]
+        created = db.execute(
+            select(models.Penalty).where(models.Penalty.penalty_id.in_(penalty_ids))
+        ).scalars().all()
+        by_id = {p.penalty_id: p for p in created}
+        logger.info(f"Created {len(penalty_ids)} penalties in bulk")
+        return [by_id[penalty_id] for penalty_id in penalty_ids]
+    except ResourceNotFoundException:
+        db.rollback()
+        raise
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Database error while creating penalties: {str(e)}")
+        raise DatabaseError(f"Error creating penalties: {str(e)}")
+
 def update_penalty(db: Session, penalty_id: str, penalty_data: Dict[str, Any]) -> Optional[models.Penalty]:
     """Update an existing penalty"""
-    db_penalty = get_penalty(db, penalty_id)
-    if not db_penalty:
-        return None
+    try:
+        values = {key: value for key, value in penalty_data.items() if key in _PENALTY_UPDATABLE}
         
-    for key, value in penalty_data.items():
-        if hasattr(db_penalty, key) and key != 'penalty_id':  # Don't update ID
-            setattr(db_penalty, key, value)
-            
-    # If marking as paid, set paid_at timestamp
-    if 'paid' in penalty_data and penalty_data['paid'] and not db_penalty.paid_at:
-        db_penalty.paid_at = datetime.utcnow()
-    elif 'paid' in penalty_data and not penalty_data['paid']:
-        db_penalty.paid_at = None
+        # If marking as paid, set paid_at timestamp unless it is already set
+        now = datetime.utcnow()
+        if 'paid' in penalty_data and penalty_data['paid']:
+            values["paid_at"] = values.get("paid_at") or func.coalesce(models.Penalty.paid_at, now)
+        elif 'paid' in penalty_data and not penalty_data['paid']:
+            values["paid_at"] = None
         
-    db_penalty.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(db_penalty)
-    logger.info(f"Updated penalty: {db_penalty.penalty_id}")
-    return db_penalty
+        values["updated_at"] = now
+        db_penalty = db.execute(
+            update(models.Penalty)
+            .where(models.Penalty.penalty_id == penalty_id)
+            .values(**values)
+            .returning(models.Penalty)
+        ).scalar_one_or_none()
+        if db_penalty is None:
+            db.rollback()
+            return None
+        db.commit()
+        invalidate_penalty_cache()
+        logger.info(f"Updated penalty: {db_penalty.penalty_id}")
+        return db_penalty
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Database error while updating penalty: {str(e)}")
+        raise DatabaseError(f"Error updating penalty: {str(e)}")
 
 def mark_penalty_as_paid(db: Session, penalty_id: str) -> models.Penalty:
     """Mark a penalty as paid with transaction management"""
     try:
-        penalty = db.query(models.Penalty).filter(models.Penalty.penalty_id == penalty_id).first()
+        penalty = db.get(models.Penalty, penalty_id)
         if not penalty:
             raise ResourceNotFoundException(f"Penalty {penalty_id} not found")
         
         if penalty.paid:
             raise ValueError("Penalty is already marked as paid")
         
-        penalty.mark_as_paid()
-        
-        # Create transaction record
-        transaction = models.Transaction(
-            transaction_id=str(uuid.uuid4()),
-            user_id=penalty.user_id,
-            amount=penalty.amount,
-            description=f"Payment for penalty {penalty_id}"
-        )
-        db.add(transaction)
+        now = datetime.utcnow()
+        penalty.mark_as_paid(now)
+        penalty.updated_at = now
+        transaction_id, log_id = generate_uuids(2)
         
-        # Create audit log
-        audit_log = models.AuditLog(
-            action="mark_penalty_paid",
-            entity_type="penalty",
-            entity_id=penalty_id,
-            user_id=penalty.user_id,
-            details=f"Marked penalty {penalty_id} as paid"
-        )
-        db.add(audit_log)
+        # Create transaction record and audit log as plain INSERTs; only the
+        # penalty is returned, so they don't need to be tracked by the session
+        db.execute(_TRANSACTION_INSERT, [{
+            "transaction_id": transaction_id,
+            "user_id": penalty.user_id,
+            "amount": penalty.amount,
+            "description": f"Payment for penalty {penalty_id}",
+            "transaction_date": now,
+            "created_at": now,
+        }])
+        db.execute(_AUDIT_LOG_INSERT, [{
+            "log_id": log_id,
+            "action": "mark_penalty_paid",
+            "entity_type": "penalty",
+            "entity_id": penalty_id,
+            "user_id": penalty.user_id,
+            "details": f"Marked penalty {penalty_id} as paid",
+            "timestamp": now,
+        }])
         
         db.commit()
-        db.refresh(penalty)
+        invalidate_penalty_cache()
         logger.info(f"Marked penalty as paid: {penalty.penalty_id}")
         return penalty
     except ResourceNotFoundException:
@@ -249,23 +504,28 @@ def mark_penalty_as_paid(db: Session, penalty_id: str) -> models.Penalty:
 
 def delete_penalty(db: Session, penalty_id: str) -> bool:
     """Delete a penalty"""
-    db_penalty = get_penalty(db, penalty_id)
-    if not db_penalty:
-        return False
-        
-    db.delete(db_penalty)
-    db.commit()
-    logger.info(f"Deleted penalty with ID: {penalty_id}")
-    return True
+    try:
+        result = db.execute(delete(models.Penalty).where(models.Penalty.penalty_id == penalty_id))
+        if result.rowcount == 0:
+            db.rollback()
+            return False
+        db.commit()
+        invalidate_penalty_cache()
+        logger.info(f"Deleted penalty with ID: {penalty_id}")
+        return True
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Database error while deleting penalty: {str(e)}")
+        raise DatabaseError(f"Error deleting penalty: {str(e)}")
 
 def get_penalties_summary(db: Session) -> Dict[str, Any]:
     """Get summary statistics for penalties."""
-    total_penalties = db.query(models.Penalty).count()
-    paid_penalties = db.query(models.Penalty).filter(models.Penalty.paid == True).count()
-    
-    total_amount = db.query(func.sum(models.Penalty.amount)).scalar() or 0
-    paid_amount = db.query(func.sum(models.Penalty.amount))\
-        .filter(models.Penalty.paid == True).scalar() or 0
+    return dict(_cached(db, ("penalties_summary",), lambda: _compute_penalties_summary(db)))
+
+def _compute_penalties_summary(db: Session) -> Dict[str, Any]:
+    total_penalties, paid_penalties, total_amount, paid_amount = db.execute(_PENALTIES_SUMMARY).one()
+    total_amount = total_amount or 0
+    paid_amount = paid_amount or 0
     
     return {
         "total_count": total_penalties,
@@ -279,20 +539,14 @@ def get_penalties_summary(db: Session) -> Dict[str, Any]:
 def get_user_penalties_summary(db: Session, user_id: str) -> schemas.PenaltySummary:
     """Get summary of user's penalties with error handling"""
     try:
-        # Verify user exists first
-        user = get_user(db, user_id)
-        
-        result = db.query(
-            func.count().label('total_count'),
-            func.sum(models.Penalty.amount).label('total_amount'),
-            func.sum(models.Penalty.paid.cast(db.Integer)).label('paid_count'),
-            func.sum(models.Penalty.amount * models.Penalty.paid.cast(db.Float)).label('paid_amount')
-        ).filter(models.Penalty.user_id == user_id).first()
+        total_count, paid_count, total_amount, paid_amount, user_exists = db.execute(
+            _USER_PENALTIES_SUMMARY, {"user_id": user_id}
+        ).one()
+        if not user_exists:
+            raise ResourceNotFoundException(f"User {user_id} not found")
         
-        total_count = result.total_count or 0
-        total_amount = result.total_amount or 0.0
-        paid_count = result.paid_count or 0
-        paid_amount = result.paid_amount or 0.0
+        total_amount = total_amount or 0.0
+        paid_amount = paid_amount or 0.0
         
         return schemas.PenaltySummary(
             total_count=total_count,
@@ -311,63 +565,95 @@ def get_user_penalties_summary(db: Session, user_id: str) -> schemas.PenaltySumm
 # Transaction operations
 def create_transaction(db: Session, transaction: schemas.TransactionCreate) -> models.Transaction:
     """Create a new transaction"""
+    now = datetime.utcnow()
+    data = transaction.model_dump()
+    data["amount"] = float(data["amount"])
+    data["transaction_date"] = data["transaction_date"] or now
     db_transaction = models.Transaction(
+        **data,
         transaction_id=str(uuid.uuid4()),
-        user_id=transaction.user_id,
-        amount=transaction.amount,
-        description=transaction.description,
-        transaction_date=transaction.transaction_date or datetime.utcnow(),
-        created_at=datetime.utcnow()
+        created_at=now
     )
     db.add(db_transaction)
     db.commit()
-    db.refresh(db_transaction)
     logger.info(f"Created new transaction for user {transaction.user_id}: {db_transaction.transaction_id}")
     return db_transaction
 
-def get_user_transactions(db: Session, user_id: str) -> List[models.Transaction]:
-    """Get transactions for a specific user"""
-    return db.query(models.Transaction).filter(models.Transaction.user_id == user_id).all()
-
 def get_transaction(db: Session, transaction_id: str) -> Optional[models.Transaction]:
     """Get a transaction by ID."""
-    return db.query(models.Transaction)\
-        .filter(models.Transaction.transaction_id == transaction_id).first()
+    return db.get(models.Transaction, transaction_id)
 
 def get_user_transactions(db: Session, user_id: str, skip: int = 0, limit: int = 100) -> List[models.Transaction]:
-    """Get all transactions for a specific user."""
+    """Get a page of a user's transactions, most recent first."""
+    # Served by idx_transaction_date (user_id, transaction_date), read backwards
     return db.query(models.Transaction)\
         .filter(models.Transaction.user_id == user_id)\
+        .order_by(models.Transaction.transaction_date.desc())\
         .offset(skip).limit(limit).all()
 
+def iter_user_transactions(db: Session, user_id: str, batch_size: int = 256) -> Iterator[models.Transaction]:
+    """Stream all of a user's transactions in batches instead of loading them all at once"""
+    return iter(
+        db.query(models.Transaction)
+        .filter(models.Transaction.user_id == user_id)
+        .yield_per(batch_size)
+    )
+
 # Audit logging
 def create_audit_log(db: Session, log_entry: schemas.AuditLogCreate) -> models.AuditLog:
     """Create a new audit log entry"""
     db_log = models.AuditLog(
+        **log_entry.model_dump(),
         log_id=str(uuid.uuid4()),
-        action=log_entry.action,
-        entity_type=log_entry.entity_type,
-        entity_id=log_entry.entity_id,
-        user_id=log_entry.user_id,
-        details=log_entry.details,
         timestamp=datetime.utcnow()
     )
     db.add(db_log)
     db.commit()
-    db.refresh(db_log)
     return db_log
 
+def create_audit_logs_bulk(db: Session, log_entries: List[schemas.AuditLogCreate]) -> int:
+    """Create several audit log entries with one executemany and a single commit"""
+    if not log_entries:
+        return 0
+    now = datetime.utcnow()
+    rows = [
+        {**entry.model_dump(), "log_id": log_id, "timestamp": now}
+        for entry, log_id in zip(log_entries, generate_uuids(len(log_entries)))
+    ]
+    try:
+        db.execute(_AUDIT_LOG_INSERT, rows)
+        db.commit()
+        return len(rows)
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Database error while creating audit logs: {str(e)}")
+        raise DatabaseError(f"Error creating audit logs: {str(e)}")
+
 def get_audit_logs(
     db: Session,
     entity_type: Optional[str] = None,
     entity_id: Optional[str] = None,
     user_id: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    before: Optional[Tuple[datetime, str]] = None
 ) -> List[models.AuditLog]:
-    """Get audit logs with optional filters."""
+    """
+    Get audit logs with optional filters, newest first.
+    
+    For keyset pagination pass the (timestamp, log_id) of the last entry of the
+    previous page as before. The log ID breaks ties between entries written
+    with the same timestamp, e.g. by create_audit_logs_bulk.
+    """
     query = db.query(models.AuditLog)
     
+    if before is not None:
+        before_timestamp, before_id = before
+        query = query.filter(or_(
+            models.AuditLog.timestamp < before_timestamp,
+            and_(models.AuditLog.timestamp == before_timestamp, models.AuditLog.log_id < before_id)
+        ))
+    
     if entity_type:
         query = query.filter(models.AuditLog.entity_type == entity_type)
     if entity_id:
@@ -375,11 +661,14 @@ def get_audit_logs(
     if user_id:
         query = query.filter(models.AuditLog.user_id == user_id)
     
-    return query.order_by(models.AuditLog.timestamp.desc())\
+    return query.order_by(models.AuditLog.timestamp.desc(), models.AuditLog.log_id.desc())\
         .offset(skip).limit(limit).all()
 
 def get_user_balance(db: Session, user_id: str) -> float:
     """Calculate a user's current balance (sum of unpaid penalties)."""
+    return _cached(db, ("user_balance", user_id), lambda: _compute_user_balance(db, user_id))
+
+def _compute_user_balance(db: Session, user_id: str) -> float:
     total_penalties = db.query(func.sum(models.Penalty.amount))\
         .filter(
             and_(
@@ -391,22 +680,50 @@ def get_user_balance(db: Session, user_id: str) -> float:
     return float(total_penalties)
 
 def pay_penalty(db: Session, penalty_id: str) -> Optional[models.Transaction]:
-    """Pay a penalty and create a transaction record."""
-    db_penalty = get_penalty(db, penalty_id)
-    if not db_penalty or db_penalty.paid:
-        return None
+    """
+    Pay a penalty and create a transaction record in one database transaction.
     
-    # Create transaction
-    transaction = create_transaction(
-        db,
-        schemas.TransactionCreate(
+    Returns None if the penalty doesn't exist or is already paid.
+    """
+    try:
+        now = datetime.utcnow()
+        # Claim the penalty with a conditional UPDATE ... RETURNING, so two
+        # concurrent payments can't both see it unpaid and pay it twice
+        db_penalty = db.execute(
+            update(models.Penalty)
+            .where(models.Penalty.penalty_id == penalty_id, models.Penalty.paid == False)
+            .values(paid=True, paid_at=now, updated_at=now)
+            .returning(models.Penalty)
+        ).scalar_one_or_none()
+        if db_penalty is None:
+            db.rollback()
+            return None
+        
+        transaction_id, log_id = generate_uuids(2)
+        transaction = models.Transaction(
+            transaction_id=transaction_id,
             user_id=db_penalty.user_id,
             amount=db_penalty.amount,
-            description=f"Payment for penalty: {db_penalty.reason or penalty_id}"
+            description=f"Payment for penalty: {db_penalty.reason or penalty_id}",
+            transaction_date=now,
+            created_at=now
         )
-    )
-    
-    # Mark penalty as paid
-    mark_penalty_as_paid(db, penalty_id)
-    
-    return transaction
+        db.add(transaction)
+        db.execute(_AUDIT_LOG_INSERT, [{
+            "log_id": log_id,
+            "action": "mark_penalty_paid",
+            "entity_type": "penalty",
+            "entity_id": penalty_id,
+            "user_id": db_penalty.user_id,
+            "details": f"Marked penalty {penalty_id} as paid",
+            "timestamp": now,
+        }])
+        
+        db.commit()
+        invalidate_penalty_cache()
+        logger.info(f"Paid penalty {penalty_id} with transaction {transaction_id}")
+        return transaction
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Database error while paying penalty: {str(e)}")
+        raise DatabaseError(f"Error paying penalty: {str(e)}")
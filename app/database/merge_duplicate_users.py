@@ -13,35 +13,47 @@ def merge_duplicate_users(db_path):
         # Start transaction
         cursor.execute("BEGIN")
         
-        # Find duplicate usernames
+        # Map every duplicate user_id to the largest user_id with the same name
+        cursor.execute("DROP TABLE IF EXISTS temp.merge_map")
         cursor.execute("""
-            SELECT user_name, GROUP_CONCAT(user_id) as user_ids, COUNT(*) as count
-            FROM users 
-            GROUP BY user_name 
-            HAVING count > 1
+            CREATE TEMP TABLE merge_map (
+                old_id INTEGER PRIMARY KEY,
+                new_id INTEGER NOT NULL
+            )
         """)
-        duplicates = cursor.fetchall()
+        cursor.execute("""
+            INSERT INTO merge_map (old_id, new_id)
+            SELECT u.user_id, keep.user_id
+            FROM users u
+            JOIN (
+                SELECT user_name, MAX(user_id) AS user_id
+                FROM users
+                GROUP BY user_name
+                HAVING COUNT(*) > 1
+            ) keep ON keep.user_name = u.user_name
+            WHERE u.user_id != keep.user_id
+        """)
+        
+        cursor.execute("""
+            SELECT u.user_name, m.new_id, GROUP_CONCAT(m.old_id)
+            FROM merge_map m
+            JOIN users u ON u.user_id = m.new_id
+            GROUP BY m.new_id
+        """)
+        for user_name, keep_id, remove_ids in cursor.fetchall():
+            print(f"Merging {user_name}: keeping ID {keep_id}, removing IDs [{remove_ids.replace(',', ', ')}]")
         
-        for user_name, user_ids, count in duplicates:
-            ids = [int(id) for id in user_ids.split(',')]
-            keep_id = max(ids)  # Keep the larger ID
-            remove_ids = [id for id in ids if id != keep_id]
-            
-            print(f"Merging {user_name}: keeping ID {keep_id}, removing IDs {remove_ids}")
-            
-            # Update references in all tables
-            for table in ['punishments', 'dues', 'transactions']:
-                cursor.execute(f"""
-                    UPDATE {table}
-                    SET user_id = ?
-                    WHERE user_id IN ({','.join('?' for _ in remove_ids)})
-                """, [keep_id] + remove_ids)
-            
-            # Delete duplicate user entries
+        # Repoint references in all tables with one statement per table
+        for table in ['punishments', 'dues', 'transactions']:
             cursor.execute(f"""
-                DELETE FROM users
-                WHERE user_name = ? AND user_id != ?
-            """, (user_name, keep_id))
+                UPDATE {table}
+                SET user_id = (SELECT new_id FROM merge_map WHERE old_id = {table}.user_id)
+                WHERE user_id IN (SELECT old_id FROM merge_map)
+            """)
+        
+        # Delete duplicate user entries
+        cursor.execute("DELETE FROM users WHERE user_id IN (SELECT old_id FROM merge_map)")
+        cursor.execute("DROP TABLE merge_map")
         
         # Commit changes
         conn.commit()
@@ -1,18 +1,47 @@
 from datetime import datetime
 import logging
 import sqlite3
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from app.config.settings import get_settings
-from app.database.models import Base
+from app.database import get_engine
+from app.database.models import create_tables
 from app.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 settings = get_settings()
 
+# Keeps updated_at current on tables whose rows change after insert. The
+# WHEN guard skips updates that already set updated_at themselves (every ORM
+# and crud update does), so those rows aren't written a second time, and the
+# trigger's own UPDATE can't fire it again.
+_TIMESTAMP_TRIGGER = """
+    DROP TRIGGER IF EXISTS update_{name}_timestamp;
+    CREATE TRIGGER update_{name}_timestamp
+    AFTER UPDATE ON {table}
+    FOR EACH ROW
+    WHEN NEW.updated_at IS OLD.updated_at
+    BEGIN
+        UPDATE {table} 
+        SET updated_at = CURRENT_TIMESTAMP
+        WHERE {pk} = NEW.{pk};
+    END;
+"""
+_TIMESTAMPED_TABLES = (
+    ("user", "users", "id"),
+    ("penalty", "penalties", "penalty_id"),
+)
+
+def _timestamp_triggers() -> str:
+    """All updated_at triggers as one script for a single executescript call"""
+    return "".join(
+        _TIMESTAMP_TRIGGER.format(name=name, table=table, pk=pk)
+        for name, table, pk in _TIMESTAMPED_TABLES
+    )
+
 MIGRATIONS = [
     # Version 1: Initial schema
     """
@@ -127,24 +156,75 @@ MIGRATIONS = [
         SET updated_at = CURRENT_TIMESTAMP
         WHERE penalty_id = NEW.penalty_id;
     END;
+    """,
+    
+    # Version 5: Covering indexes for the unpaid-penalty and audit history queries
+    """
+    -- Answers the per-user paid filter and the unpaid amount sum from the index alone
+    CREATE INDEX IF NOT EXISTS idx_penalties_user_paid 
+    ON penalties(user_id, paid, amount);
+    
+    -- Serves the entity filter together with the newest-first ordering
+    CREATE INDEX IF NOT EXISTS idx_audit_logs_ts 
+    ON audit_logs(entity_type, entity_id, timestamp DESC);
+    
+    -- Superseded by idx_penalties_user_paid, which shares their leading columns
+    DROP INDEX IF EXISTS idx_penalties_user_id;
+    DROP INDEX IF EXISTS ix_penalties_user_id;
+    DROP INDEX IF EXISTS idx_penalty_status;
+    """,
+    
+    # Version 6: Recreate the updated_at triggers with the WHEN guard
+    _timestamp_triggers(),
+    
+    # Version 7: Drop the indexes create_all made on the primary keys; the
+    # PRIMARY KEY constraint already has its own automatic index
+    """
+    DROP INDEX IF EXISTS ix_users_id;
+    DROP INDEX IF EXISTS ix_penalties_penalty_id;
+    DROP INDEX IF EXISTS ix_transactions_transaction_id;
+    DROP INDEX IF EXISTS ix_audit_logs_log_id;
+    """,
+    
+    # Version 8: Drop the cascade_delete_penalties trigger; the ON DELETE
+    # CASCADE foreign keys of penalties and transactions already remove a
+    # deleted user's rows, so the trigger repeated the same deletes
+    """
+    DROP TRIGGER IF EXISTS cascade_delete_penalties;
     """
 ]
 
+# Schema version per database URL, recorded once migrations are known to be
+# applied so later calls in the same process skip the schema_version query.
+# In-memory databases are never cached since each connection gets a new one.
+_VERSION_CACHE: Dict[str, int] = {}
+
+def _version_cache_key(url) -> Optional[str]:
+    """The _VERSION_CACHE key for a database URL, or None if it can't be cached"""
+    if url.database in (None, "", ":memory:"):
+        return None
+    return str(url)
+
+# Statements used on every migrate_db call, built once at import
+_CURRENT_VERSION = text("SELECT MAX(version) FROM schema_version")
+_RECORD_MIGRATION = text("INSERT INTO schema_version (version, applied_at) VALUES (:version, :applied_at)")
+
 def get_current_version(db: Session) -> int:
-    """Get the current database schema version"""
+    """Get the current database schema version, from _VERSION_CACHE once known"""
+    cache_key = _version_cache_key(db.get_bind().url)
+    if cache_key in _VERSION_CACHE:
+        return _VERSION_CACHE[cache_key]
     try:
-        result = db.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
-        return result or 0
+        version = db.execute(_CURRENT_VERSION).scalar() or 0
     except Exception:
         return 0
+    if cache_key:
+        _VERSION_CACHE[cache_key] = version
+    return version
 
 def record_migration(db: Session, version: int):
-    """Record that a migration has been applied"""
-    db.execute(
-        text("INSERT INTO schema_version (version, applied_at) VALUES (:version, :applied_at)"),
-        {"version": version, "applied_at": datetime.utcnow()}
-    )
-    db.commit()
+    """Record that a migration has been applied; the caller commits"""
+    db.execute(_RECORD_MIGRATION, {"version": version, "applied_at": datetime.utcnow()})
 
 def migrate_db(db: Session, target_version: Optional[int] = None) -> None:
     """
@@ -154,42 +234,54 @@ def migrate_db(db: Session, target_version: Optional[int] = None) -> None:
         db: The database session
         target_version: Optional specific version to migrate to
     """
-    current_version = get_current_version(db)
     if target_version is None:
         target_version = len(MIGRATIONS)
     
+    current_version = get_current_version(db)
     if current_version >= target_version:
-        logger.info(f"Database is already at version {current_version}")
+        logger.debug(f"Database is already at version {current_version}")
         return
     
+    cache_key = _version_cache_key(db.get_bind().url)
+    
     logger.info(f"Current database version: {current_version}")
     logger.info(f"Target database version: {target_version}")
     
     for version, migration in enumerate(MIGRATIONS[current_version:target_version], start=current_version + 1):
         logger.info(f"Applying migration version {version}...")
         try:
-            # Split migration into individual statements
-            statements = [s.strip() for s in migration.split(';') if s.strip()]
-            for statement in statements:
-                db.execute(text(statement))
+            # Run the whole script in one executescript call on the DBAPI
+            # connection; it also keeps trigger bodies with inner ';' intact.
+            # The script opens the transaction and leaves it open, so the
+            # version row is committed together with the schema changes.
+            # Foreign keys are checked once at that commit, not per row.
+            db.connection().connection.driver_connection.executescript(
+                "BEGIN IMMEDIATE;\nPRAGMA defer_foreign_keys = ON;\n" + migration
+            )
             
             record_migration(db, version)
             db.commit()
+            if cache_key:
+                _VERSION_CACHE[cache_key] = version
             logger.info(f"Successfully applied migration version {version}")
         except Exception as e:
             db.rollback()
             logger.error(f"Error applying migration version {version}: {str(e)}")
             raise
+    
+    # Let SQLite refresh planner statistics for the new indexes
+    db.execute(text("PRAGMA optimize"))
 
 def init_db():
     """Initialize database and run migrations"""
-    engine = create_engine(
-        settings.DATABASE_URL,
-        connect_args={"check_same_thread": False}
-    )
+    # The shared engine applies the SQLite connection PRAGMAs (WAL,
+    # synchronous=NORMAL, foreign_keys=ON) to every connection it opens
+    engine = get_engine()
+    if _VERSION_CACHE.get(_version_cache_key(engine.url)) == len(MIGRATIONS):
+        return engine
     
     # Create all tables
-    Base.metadata.create_all(bind=engine)
+    create_tables(engine)
     
     # Run migrations
     with Session(engine) as session:
@@ -197,6 +289,8 @@ def init_db():
     
     return engine
 
+_SCHEMA_OBJECTS = text("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'index')")
+
 def verify_database_integrity(db: Session) -> bool:
     """
     Verify the integrity of the database schema and constraints.
@@ -206,38 +300,42 @@ def verify_database_integrity(db: Session) -> bool:
     """
     try:
         # Check table existence and basic structure
-        tables = [
+        tables = {
             'users',
             'penalties',
             'transactions',
             'audit_logs',
             'schema_version'
-        ]
-        
-        for table in tables:
-            result = db.execute(text(f"SELECT 1 FROM {table} LIMIT 1"))
-            result.fetchall()  # Just to verify the query succeeds
-        
-        # Verify foreign key constraints
-        db.execute(text("PRAGMA foreign_key_check"))
-        
-        # Check indexes
-        required_indexes = [
-            'idx_penalties_user_id',
+        }
+        required_indexes = {
+            'idx_penalties_user_paid',
             'idx_penalties_paid',
             'idx_users_name',
             'idx_transactions_user_id',
             'idx_audit_logs_entity_id'
-        ]
+        }
         
-        for index in required_indexes:
-            result = db.execute(
-                text("SELECT 1 FROM sqlite_master WHERE type='index' AND name=:index"),
-                {"index": index}
-            )
-            if not result.fetchone():
+        # One catalog read covers both the table and the index checks
+        existing = {(row.type, row.name) for row in db.execute(_SCHEMA_OBJECTS)}
+        
+        missing_tables = {t for t in tables if ('table', t) not in existing}
+        if missing_tables:
+            logger.error(f"Required tables are missing: {', '.join(sorted(missing_tables))}")
+            return False
+        
+        # Structural check of every page and table b-tree; unlike
+        # integrity_check it skips cross-checking indexes against table rows
+        result = db.execute(text("PRAGMA quick_check")).scalar()
+        if result != "ok":
+            logger.error(f"Database quick_check failed: {result}")
+            return False
+        
+        # Check indexes
+        missing_indexes = {i for i in required_indexes if ('index', i) not in existing}
+        if missing_indexes:
+            for index in sorted(missing_indexes):
                 logger.error(f"Required index {index} is missing")
-                return False
+            return False
         
         return True
         
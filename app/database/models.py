@@ -1,17 +1,18 @@
+import threading
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from uuid import uuid4
-import os
 
-from sqlalchemy import Column, String, Float, Boolean, DateTime, ForeignKey, Text, create_engine, Index
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Float, Boolean, DateTime, ForeignKey, Text, Index, select, func, case, text
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import relationship, object_session
 from app.database import Base
 
 class User(Base):
     """User model for storing user information"""
     __tablename__ = "users"
     
-    id = Column(String(36), primary_key=True, index=True, default=lambda: str(uuid4()))
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
     name = Column(String(100), index=True, nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=True)
     phone = Column(String(20), nullable=True)
@@ -29,22 +30,84 @@ class User(Base):
     def __repr__(self) -> str:
         return f"<User(id={self.id}, name={self.name})>"
     
-    @property
+    def penalty_totals(self) -> Tuple[float, float]:
+        """
+        Calculate (unpaid, paid) penalty totals for this user.
+        
+        Uses totals attached by load_penalty_totals if there are any, then the
+        penalties already loaded on this user, and otherwise sums them in SQL
+        without loading the Penalty rows.
+        """
+        if "_penalty_totals" in self.__dict__:
+            return self._penalty_totals
+        session = object_session(self)
+        if "penalties" in self.__dict__ or session is None:
+            unpaid = sum(penalty.amount for penalty in self.penalties if not penalty.paid)
+            paid = sum(penalty.amount for penalty in self.penalties if penalty.paid)
+            return unpaid, paid
+        unpaid, paid = session.execute(
+            select(*_penalty_sums()).where(Penalty.user_id == self.id)
+        ).one()
+        return float(unpaid), float(paid)
+    
+    @classmethod
+    def load_penalty_totals(cls, session, users: List["User"]) -> None:
+        """
+        Compute the penalty totals of several users with one grouped query and
+        attach them, so their total_* properties don't query once per user.
+        """
+        if not users:
+            return
+        totals = {
+            user_id: (float(unpaid), float(paid))
+            for user_id, unpaid, paid in session.execute(
+                select(Penalty.user_id, *_penalty_sums())
+                .where(Penalty.user_id.in_([user.id for user in users]))
+                .group_by(Penalty.user_id)
+            )
+        }
+        for user in users:
+            user._penalty_totals = totals.get(user.id, (0.0, 0.0))
+    
+    @hybrid_property
     def total_unpaid_penalties(self) -> float:
         """Calculate total unpaid penalties for this user"""
-        return sum(penalty.amount for penalty in self.penalties if not penalty.paid)
+        return self.penalty_totals()[0]
     
-    @property
+    @total_unpaid_penalties.expression
+    def total_unpaid_penalties(cls):
+        return (
+            select(func.coalesce(func.sum(Penalty.amount), 0))
+            .where(Penalty.user_id == cls.id, Penalty.paid == False)
+            .scalar_subquery()
+        )
+    
+    @hybrid_property
     def total_paid_penalties(self) -> float:
         """Calculate total paid penalties for this user"""
-        return sum(penalty.amount for penalty in self.penalties if penalty.paid)
+        return self.penalty_totals()[1]
+    
+    @total_paid_penalties.expression
+    def total_paid_penalties(cls):
+        return (
+            select(func.coalesce(func.sum(Penalty.amount), 0))
+            .where(Penalty.user_id == cls.id, Penalty.paid == True)
+            .scalar_subquery()
+        )
+
+def _penalty_sums():
+    """(unpaid, paid) penalty amount sums, computed in one pass over the rows"""
+    return (
+        func.coalesce(func.sum(case((Penalty.paid == False, Penalty.amount), else_=0)), 0),
+        func.coalesce(func.sum(case((Penalty.paid == True, Penalty.amount), else_=0)), 0)
+    )
 
 class Penalty(Base):
     """Penalty model for storing user penalties"""
     __tablename__ = "penalties"
     
-    penalty_id = Column(String(36), primary_key=True, index=True, default=lambda: str(uuid4()))
-    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    penalty_id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     amount = Column(Float, nullable=False)
     reason = Column(Text, nullable=True)
     date = Column(DateTime, default=datetime.utcnow)
@@ -57,23 +120,23 @@ class Penalty(Base):
     user = relationship("User", back_populates="penalties")
     
     __table_args__ = (
-        Index('idx_penalty_status', 'user_id', 'paid'),  # Composite index for filtering penalties by status
+        Index('idx_penalties_user_paid', 'user_id', 'paid', 'amount'),  # Covering index for status filters and unpaid sums
         Index('idx_penalty_date', 'user_id', 'date'),    # Composite index for date-based queries
     )
 
     def __repr__(self) -> str:
         return f"<Penalty(id={self.penalty_id}, user={self.user_id}, amount={self.amount}, paid={self.paid})>"
     
-    def mark_as_paid(self) -> None:
-        """Mark this penalty as paid"""
+    def mark_as_paid(self, paid_at: Optional[datetime] = None) -> None:
+        """Mark this penalty as paid, at paid_at if given or else now"""
         self.paid = True
-        self.paid_at = datetime.utcnow()
+        self.paid_at = paid_at or datetime.utcnow()
 
 class Transaction(Base):
     """Transaction model for storing payment transactions"""
     __tablename__ = "transactions"
     
-    transaction_id = Column(String(36), primary_key=True, index=True, default=lambda: str(uuid4()))
+    transaction_id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
     user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
     amount = Column(Float, nullable=False)
     transaction_date = Column(DateTime, default=datetime.utcnow)
@@ -94,7 +157,7 @@ class AuditLog(Base):
     """Audit log for tracking important system activities"""
     __tablename__ = "audit_logs"
     
-    log_id = Column(String(36), primary_key=True, index=True, default=lambda: str(uuid4()))
+    log_id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
     action = Column(String(50), nullable=False)
     entity_type = Column(String(50), nullable=False)
     entity_id = Column(String(36), nullable=True)
@@ -107,28 +170,49 @@ class AuditLog(Base):
     
     __table_args__ = (
         Index('idx_audit_search', 'action', 'entity_type', 'timestamp'),  # Composite index for audit queries
+        Index('idx_audit_logs_ts', 'entity_type', 'entity_id', timestamp.desc()),  # Entity history, newest first
     )
 
     def __repr__(self) -> str:
         return f"<AuditLog(id={self.log_id}, action={self.action}, entity={self.entity_type})>"
 
 def get_engine():
-    """Get SQLAlchemy engine"""
-    from app.config.settings import get_settings
-    settings = get_settings()
-    
-    # Ensure database directory exists
-    if not settings.DATABASE_URL.startswith("sqlite:///:memory:"):
-        db_dir = os.path.dirname(settings.DATABASE_URL.replace('sqlite:///', ''))
-        os.makedirs(db_dir, exist_ok=True)
-    
-    return create_engine(
-        settings.DATABASE_URL,
-        connect_args={"check_same_thread": False}
-    )
+    """Get the shared SQLAlchemy engine"""
+    from app.database import get_engine as get_shared_engine
+    return get_shared_engine()
+
+def create_tables(engine) -> None:
+    """
+    Create the model tables unless they all exist already.
+    
+    On SQLite one sqlite_master query replaces the per-table existence checks
+    create_all would issue on every start against an existing database.
+    """
+    if engine.dialect.name == "sqlite":
+        tables = list(Base.metadata.tables)
+        placeholders = ", ".join(f":t{i}" for i in range(len(tables)))
+        with engine.connect() as conn:
+            found = conn.execute(
+                text(f"SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})"),
+                {f"t{i}": name for i, name in enumerate(tables)}
+            ).scalar()
+        if found == len(tables):
+            return
+    Base.metadata.create_all(bind=engine)
+
+# Set once init_db has created the tables in this process, so later calls
+# (from startup and from scripts that import init_db) skip the catalog check
+_db_initialized = False
+_init_db_lock = threading.Lock()
 
 def init_db():
-    """Initialize the database"""
+    """Initialize the database, once per process"""
+    global _db_initialized
     engine = get_engine()
-    Base.metadata.create_all(bind=engine)
+    if _db_initialized:
+        return engine
+    with _init_db_lock:
+        if not _db_initialized:
+            create_tables(engine)
+            _db_initialized = True
     return engine
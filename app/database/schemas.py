@@ -8,6 +8,18 @@ from decimal import Decimal
 
 # Base models configurations
 model_config = ConfigDict(from_attributes=True)
+# Request payloads are read once by crud and never modified
+create_model_config = ConfigDict(frozen=True)
+
+# International phone numbers; \Z so a trailing newline doesn't match
+PHONE_PATTERN = re.compile(r'^\+?1?\d{9,15}\Z')
+
+def _canonical_uuid(v: str) -> str:
+    """Parse v with the stdlib UUID parser and return its canonical lowercase form"""
+    try:
+        return str(UUID(v))
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError('Invalid UUID format')
 
 class PenaltyBase(BaseModel):
     user_id: str = Field(..., description="ID of the user who received the penalty")
@@ -17,9 +29,7 @@ class PenaltyBase(BaseModel):
 
     @field_validator('user_id')
     def validate_uuid(cls, v):
-        if v and not re.match(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', v):
-            raise ValueError('Invalid UUID format')
-        return v
+        return _canonical_uuid(v) if v else v
 
 class Penalty(PenaltyBase):
     model_config = model_config
@@ -37,7 +47,7 @@ class UserBase(BaseModel):
 
     @field_validator('phone')
     def validate_phone(cls, v):
-        if v and not re.match(r'^\+?1?\d{9,15}$', v):
+        if v and not PHONE_PATTERN.match(v):
             raise ValueError('Invalid phone number format')
         return v
 
@@ -60,7 +70,7 @@ class UserWithPenalties(User):
     penalties: List[Penalty]
 
 class UserCreate(UserBase):
-    pass
+    model_config = create_model_config
 
 class UserUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=100)
@@ -69,12 +79,12 @@ class UserUpdate(BaseModel):
 
     @field_validator('phone')
     def validate_phone(cls, v):
-        if v and not re.match(r'^\+?1?\d{9,15}$', v):
+        if v and not PHONE_PATTERN.match(v):
             raise ValueError('Invalid phone number format')
         return v
 
 class PenaltyCreate(PenaltyBase):
-    pass
+    model_config = create_model_config
 
 class PenaltyUpdate(BaseModel):
     amount: Optional[Decimal] = Field(None, gt=0)
@@ -97,11 +107,7 @@ class TransactionBase(BaseModel):
 
     @field_validator('user_id')
     def validate_uuid(cls, v):
-        try:
-            UUID(v)
-            return v
-        except ValueError:
-            raise ValueError('Invalid UUID format')
+        return _canonical_uuid(v)
 
     @field_validator('amount')
     def validate_amount(cls, v):
@@ -110,7 +116,7 @@ class TransactionBase(BaseModel):
         return v
 
 class TransactionCreate(TransactionBase):
-    pass
+    model_config = create_model_config
 
 class Transaction(TransactionBase):
     model_config = model_config
@@ -126,7 +132,7 @@ class AuditLogBase(BaseModel):
     details: Optional[str] = Field(None, description="Additional details about the action")
 
 class AuditLogCreate(AuditLogBase):
-    pass
+    model_config = create_model_config
 
 class AuditLog(AuditLogBase):
     model_config = model_config
@@ -138,13 +144,15 @@ class PenaltySummary(BaseModel):
     total_count: int = Field(..., description="Total number of penalties")
     paid_count: int = Field(..., description="Number of paid penalties")
     unpaid_count: int = Field(..., description="Number of unpaid penalties")
-    total_amount: Decimal = Field(..., description="Total amount of all penalties")
-    paid_amount: Decimal = Field(..., description="Total amount of paid penalties")
-    unpaid_amount: Decimal = Field(..., description="Total amount of unpaid penalties")
+    # Sums come back from SQLite as floats; keep them as floats rather than
+    # converting each one to Decimal
+    total_amount: float = Field(..., description="Total amount of all penalties")
+    paid_amount: float = Field(..., description="Total amount of paid penalties")
+    unpaid_amount: float = Field(..., description="Total amount of unpaid penalties")
 
 class UserBalance(BaseModel):
     user_id: str = Field(..., description="User ID")
-    total_unpaid: Decimal = Field(..., description="Total amount of unpaid penalties")
+    total_unpaid: float = Field(..., description="Total amount of unpaid penalties")
 
 class StandardResponse(BaseModel):
     success: bool = Field(..., description="Whether the operation was successful")
@@ -170,7 +170,7 @@ def verify_migration(db_path: str) -> bool:
         cursor.execute("SELECT name FROM sqlite_master WHERE type='index'")
         indexes = [row[0] for row in cursor.fetchall()]
         required_indexes = [
-            'idx_penalties_user_id',
+            'idx_penalties_user_paid',
             'idx_penalties_paid',
             'idx_users_name',
             'idx_transactions_user_id',
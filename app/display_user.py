@@ -42,9 +42,9 @@ def get_db_connection(db_path=None):
             else:
                 raise ValueError(f"Unsupported database URL format: {db_url}")
         
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        # Rows are only unpacked and indexed by position, so plain tuples are
+        # enough and cheaper to build than sqlite3.Row objects
+        return sqlite3.connect(db_path)
     except sqlite3.Error as e:
         logger.error(f"Database connection error: {str(e)}")
         raise
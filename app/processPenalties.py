@@ -1,15 +1,11 @@
-import os
 import sqlite3
 import logging
-from app.config.settings import get_settings
+from app.database import get_db_path
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Get application settings
-settings = get_settings()
-
 def get_db_connection():
     """
     Get a connection to the SQLite database with proper error handling.
@@ -21,20 +17,9 @@ def get_db_connection():
         sqlite3.Error: If connection fails
     """
     try:
-        # Extract database path from settings
-        db_url = settings.DATABASE_URL
-        if db_url.startswith('sqlite:///'):
-            db_path = db_url.replace('sqlite:///', '')
-            # Ensure path is absolute
-            if not os.path.isabs(db_path):
-                db_path = os.path.join(os.getcwd(), db_path)
-        else:
-            logger.warning(f"Unsupported database URL format: {db_url}, using default path")
-            db_path = os.path.join(os.getcwd(), 'database', 'penalties.db')
-        
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        # Rows are unpacked positionally, so plain tuples are enough and
+        # cheaper to build than sqlite3.Row objects
+        return sqlite3.connect(get_db_path())
     except sqlite3.Error as e:
         logger.error(f"Database connection error: {str(e)}")
         raise
@@ -60,11 +45,10 @@ def process_penalties():
         """
 
         cursor.execute(query, ('NO',))
-        rows = cursor.fetchall()
 
+        # Iterate the cursor directly so rows are consumed as SQLite returns them
         user_penalties = {}
-        for row in rows:
-            user_id, user_name, penalty_amount, penalty_reason = row
+        for user_id, user_name, penalty_amount, penalty_reason in cursor:
             if user_id not in user_penalties:
                 user_penalties[user_id] = {'user_name': user_name, 'amount': 0}
             
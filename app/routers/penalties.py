@@ -33,12 +33,17 @@ def read_penalties(
     skip: int = Query(0, ge=0, description="Skip N penalties"),
     limit: int = Query(100, ge=1, le=100, description="Limit the number of penalties returned"),
     paid: Optional[bool] = Query(None, description="Filter by paid status"),
+    after_id: Optional[str] = Query(None, description="Return penalties after this ID (last ID of the previous page)"),
     db: Session = Depends(get_db)
 ):
     """
     Get a list of penalties with optional filtering and pagination
+    
+    Penalties are ordered by ID, not by creation, so that skip/limit pages
+    and after_id pages follow the same order. IDs are random UUIDs, so this
+    order is stable but not chronological.
     """
-    penalties = crud.get_penalties(db, skip=skip, limit=limit, paid=paid)
+    penalties = crud.get_penalties(db, skip=skip, limit=limit, paid=paid, after_id=after_id)
     return penalties
 
 @router.get("/{penalty_id}", response_model=schemas.PenaltyResponse)
@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.database import crud, schemas
-from app.database.models import get_db
+from app.database import get_db
 from app.utils.logging_config import get_logger
 
 router = APIRouter(tags=["transactions"], prefix="/transactions")
@@ -57,10 +57,12 @@ def read_transaction(
 @router.get("/user/{user_id}", response_model=List[schemas.TransactionResponse])
 def get_user_transactions(
     user_id: str = Path(..., description="The ID of the user"),
+    skip: int = Query(0, ge=0, description="Skip N transactions"),
+    limit: int = Query(100, ge=1, le=100, description="Limit the number of transactions returned"),
     db: Session = Depends(get_db)
 ):
     """
-    Get all transactions for a specific user
+    Get a user's transactions, most recent first
     """
     # Verify user exists
     user = crud.get_user(db, user_id=user_id)
@@ -70,7 +72,7 @@ def get_user_transactions(
             detail=f"User with ID {user_id} not found"
         )
     
-    return crud.get_user_transactions(db, user_id=user_id)
+    return crud.get_user_transactions(db, user_id=user_id, skip=skip, limit=limit)
 
 @router.post("/pay-penalty/{penalty_id}", response_model=schemas.TransactionResponse)
 def pay_penalty(
@@ -94,16 +96,13 @@ def pay_penalty(
             detail="Penalty is already paid"
         )
     
-    # Create a transaction
-    transaction = schemas.TransactionCreate(
-        user_id=penalty.user_id,
-        amount=penalty.amount,
-        description=f"Payment for penalty: {penalty.reason or 'Unnamed penalty'}"
-    )
-    
-    db_transaction = crud.create_transaction(db=db, transaction=transaction)
-    
-    # Mark the penalty as paid
-    crud.mark_penalty_paid(db, penalty_id=penalty_id)
+    # Mark the penalty as paid and record the transaction in one commit
+    db_transaction = crud.pay_penalty(db, penalty_id=penalty_id)
+    if db_transaction is None:
+        # Paid by a concurrent request since the check above
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Penalty is already paid"
+        )
     
     return db_transaction
\ No newline at end of file
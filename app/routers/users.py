@@ -26,12 +26,21 @@ def read_users(
     skip: int = Query(0, ge=0, description="Skip N users"),
     limit: int = Query(100, ge=1, le=100, description="Limit the number of users returned"),
     search: Optional[str] = Query(None, description="Search users by name or email"),
+    after_id: Optional[str] = Query(None, description="Return users after this ID (last ID of the previous page)"),
     db: Session = Depends(get_db)
 ):
     """
     Get a list of users with optional search and pagination
+    
+    Users are ordered by ID, not by creation, so that skip/limit pages and
+    after_id pages follow the same order. IDs are random UUIDs, so this
+    order is stable but not chronological.
     """
-    users = crud.get_users(db, skip=skip, limit=limit, search=search)
+    # The response includes penalty totals, so compute them for the whole
+    # page in one grouped query instead of per user
+    users = crud.get_users(
+        db, skip=skip, limit=limit, search=search, after_id=after_id, with_totals=True
+    )
     return users
 
 @router.get("/{user_id}", response_model=schemas.UserWithPenalties)
@@ -42,7 +51,9 @@ def read_user(
     """
     Get detailed information about a specific user including their penalties
     """
-    db_user = crud.get_user(db, user_id=user_id)
+    # The response lists the penalties and their totals; loading them with
+    # the user lets the totals be summed from the same rows
+    db_user = crud.get_user(db, user_id=user_id, load_penalties=True)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
@@ -105,7 +116,7 @@ def get_user_balance(
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
         
-    penalties = crud.get_user_penalties(db, user_id=user_id, include_paid=False)
+    penalties = crud.iter_user_penalties(db, user_id=user_id, include_paid=False)
     total = sum(penalty.amount for penalty in penalties)
     
     return total
\ No newline at end of file
@@ -8,7 +8,8 @@ from app.services.file_handler import FileHandler
 from app.utils.logging_config import get_logger
 from app.config.settings import get_settings
 from app.errors.exceptions import FileProcessingException
-from app.database import get_db
+from app.utils.helpers import generate_uuids
+from app.database import get_db, crud
 from sqlalchemy.orm import Session
 
 logger = get_logger(__name__)
@@ -221,6 +222,8 @@ class CSVImporter:
         from app.database.models import Penalty, User
         
         saved_count = 0
+        # Ids for the whole import from one urandom read
+        penalty_ids = iter(generate_uuids(len(punishments)))
         
         for p in punishments:
             try:
@@ -236,7 +239,7 @@ class CSVImporter:
                 
                 # Create penalty
                 penalty = Penalty(
-                    penalty_id=str(uuid.uuid4()),
+                    penalty_id=next(penalty_ids),
                     user_id=user.id,
                     amount=p['amount'],
                     reason=p.get('reason', ''),
@@ -252,6 +255,7 @@ class CSVImporter:
                 # Continue processing other records
         
         db.commit()
+        crud.invalidate_penalty_cache()
         logger.info(f"Saved {saved_count} punishments to database")
         return saved_count
     
@@ -42,18 +42,10 @@ class FinancialService:
                 raise PaymentError("Penalty already paid", 
                     {"penalty_id": penalty_id, "paid_at": penalty.paid_at})
 
-            # Create transaction record
-            transaction = crud.create_transaction(
-                self.db,
-                schemas.TransactionCreate(
-                    user_id=penalty.user_id,
-                    amount=penalty.amount,
-                    description=f"Payment for penalty: {penalty.reason or penalty_id}"
-                )
-            )
-
-            # Mark penalty as paid
-            penalty = crud.mark_penalty_as_paid(self.db, penalty_id)
+            # Mark penalty as paid and create the transaction record together
+            transaction = crud.pay_penalty(self.db, penalty_id)
+            if transaction is None:
+                raise PaymentError("Penalty already paid", {"penalty_id": penalty_id})
 
             return penalty, transaction
         except SQLAlchemyError as e:
@@ -133,19 +125,27 @@ class FinancialService:
 
     def get_payment_summary(self, user_id: str) -> dict:
         """Get payment summary for a user."""
-        penalties = crud.get_user_penalties(self.db, user_id)
-        transactions = crud.get_user_transactions(self.db, user_id)
-
-        total_penalties = sum(p.amount for p in penalties)
-        paid_penalties = sum(p.amount for p in penalties if p.paid)
-        total_payments = sum(t.amount for t in transactions)
+        # Single pass over each stream, so no full list is held in memory
+        total_penalties = 0
+        paid_penalties = 0
+        for p in crud.iter_user_penalties(self.db, user_id):
+            total_penalties += p.amount
+            if p.paid:
+                paid_penalties += p.amount
+
+        total_payments = 0
+        last_payment_date = None
+        for t in crud.iter_user_transactions(self.db, user_id):
+            total_payments += t.amount
+            if last_payment_date is None or t.transaction_date > last_payment_date:
+                last_payment_date = t.transaction_date
 
         return {
             "total_penalties": total_penalties,
             "paid_penalties": paid_penalties,
             "unpaid_penalties": total_penalties - paid_penalties,
             "total_payments": total_payments,
-            "last_payment_date": max((t.transaction_date for t in transactions), default=None) if transactions else None
+            "last_payment_date": last_payment_date
         }
 
     def refund_payment(self, transaction_id: str, reason: str) -> models.Transaction:
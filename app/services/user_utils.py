@@ -3,6 +3,7 @@
 from typing import List, Dict, Any, Optional
 import uuid
 import sqlite3
+from contextlib import closing
 from sqlalchemy.orm import Session
 
 from app.utils.logging_config import get_logger
@@ -20,12 +21,8 @@ def display_user_ids(db_path: str) -> List[tuple]:
     Returns:
         List of tuples containing (user_id, user_name)
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('SELECT user_id, user_name FROM users ORDER BY user_name')
-    users = cursor.fetchall()
-    conn.close()
-    return users
+    with closing(sqlite3.connect(db_path)) as conn:
+        return conn.execute('SELECT user_id, user_name FROM users ORDER BY user_name').fetchall()
 
 def validate_user_id(db_path: str, user_id: int) -> bool:
     """
@@ -38,11 +35,8 @@ def validate_user_id(db_path: str, user_id: int) -> bool:
     Returns:
         Boolean indicating whether the user ID exists
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) FROM users WHERE user_id = ?', (user_id,))
-    count = cursor.fetchone()[0]
-    conn.close()
+    with closing(sqlite3.connect(db_path)) as conn:
+        count = conn.execute('SELECT COUNT(*) FROM users WHERE user_id = ?', (user_id,)).fetchone()[0]
     return count > 0
 
 class UserUtils:
@@ -108,6 +102,7 @@ class UserUtils:
         Returns:
             Created user object
         """
+        from app.database.crud import invalidate_penalty_cache
         from app.database.models import User
         
         try:
@@ -128,6 +123,7 @@ class UserUtils:
             
             db.add(user)
             db.commit()
+            invalidate_penalty_cache()
             db.refresh(user)
             
             logger.info(f"Created new user: {user.name} (ID: {user.id})")
@@ -150,6 +146,7 @@ class UserUtils:
         Returns:
             Updated user object
         """
+        from app.database.crud import invalidate_penalty_cache
         from app.database.models import User
         
         try:
@@ -163,6 +160,7 @@ class UserUtils:
                     setattr(user, key, value)
             
             db.commit()
+            invalidate_penalty_cache()
             db.refresh(user)
             
             logger.info(f"Updated user: {user.name} (ID: {user.id})")
@@ -184,6 +182,7 @@ class UserUtils:
         Returns:
             Boolean indicating success
         """
+        from app.database.crud import invalidate_penalty_cache
         from app.database.models import User
         
         try:
@@ -191,8 +190,10 @@ class UserUtils:
             if not user:
                 raise ResourceNotFoundException("User", user_id)
             
+            # Deleting the user cascades to their penalties
             db.delete(user)
             db.commit()
+            invalidate_penalty_cache()
             
             logger.info(f"Deleted user: {user.name} (ID: {user.id})")
             return True
@@ -10,6 +10,13 @@ logger = logging.getLogger(__name__)
 # Get application settings
 settings = get_settings()
 
+# Columns of the penalties table, listed explicitly so the query result has a
+# fixed shape even if the table gains columns
+PENALTY_COLUMNS = (
+    "penalty_id, user_id, team_id, penalty_created, penalty_reason, penalty_archived, "
+    "penalty_amount, penalty_currency, penalty_subject, search_params, penalty_paid_date"
+)
+
 def get_db_path():
     """
     Extract the database path from settings.
@@ -53,7 +60,7 @@ def query_penalties(limit=None, where_clause=None, params=None):
         cursor = conn.cursor()
 
         # Build query with proper parameterization
-        query = "SELECT * FROM penalties"
+        query = f"SELECT {PENALTY_COLUMNS} FROM penalties"
         
         # Add where clause if provided
         if where_clause:
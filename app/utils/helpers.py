@@ -0,0 +1,29 @@
+"""
+Helper utilities for the BalanceUp API
+"""
+
+import os
+from typing import List
+
+def generate_uuids(count: int) -> List[str]:
+    """
+    Generate RFC 4122 version 4 UUID strings in bulk.
+
+    Entropy for all UUIDs is read with a single os.urandom call instead of
+    one call (plus a uuid.UUID instance) per identifier.
+
+    Args:
+        count: Number of UUIDs to generate
+
+    Returns:
+        List[str]: Hyphenated lowercase UUID strings, as produced by str(uuid.uuid4())
+    """
+    raw = bytearray(os.urandom(16 * count))
+    uuids = []
+    for offset in range(0, 16 * count, 16):
+        # Set the version (4) and variant (RFC 4122) bits
+        raw[offset + 6] = (raw[offset + 6] & 0x0F) | 0x40
+        raw[offset + 8] = (raw[offset + 8] & 0x3F) | 0x80
+        h = raw[offset:offset + 16].hex()
+        uuids.append(f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}")
+    return uuids
@@ -86,7 +86,8 @@ def list_users(with_penalties):
     logger.info("Listing users...")
     try:
         with next(get_db()) as db:
-            users_data = crud.get_users(db)
+            # Plain rows are enough unless penalties and balances are shown
+            users_data = crud.get_users(db) if with_penalties else crud.get_users_lite(db)
             click.echo(f"Found {len(users_data)} users:")
             
             for user in users_data:
@@ -152,13 +153,12 @@ def list_penalties(paid, unpaid):
             elif unpaid and not paid:
                 paid_filter = False
                 
-            penalties_data = crud.get_penalties(db, paid=paid_filter)
+            penalties_data = crud.get_penalties_lite(db, paid=paid_filter)
             click.echo(f"Found {len(penalties_data)} penalties:")
             
             for p in penalties_data:
                 status = "PAID" if p.paid else "UNPAID"
-                user = crud.get_user(db, p.user_id)
-                username = user.name if user else "Unknown User"
+                username = p.user_name or "Unknown User"
                 click.echo(f"{username}: {p.amount:.2f} - {p.reason} [{status}]")
     except Exception as e:
         click.echo(f"Error: {str(e)}")
@@ -1,4 +1,6 @@
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -38,12 +40,24 @@ register_error_handlers(app)
 async def startup_event():
     """Initialize services on startup"""
     logger.info("Starting up API service")
-    init_db()
+    # Blocking database work awaited from async code runs on the default
+    # executor; size it to match the database connection pool
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.DB_POOL_SIZE, thread_name_prefix="db")
+    )
+    await asyncio.to_thread(init_db)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up resources on shutdown"""
     logger.info("Shutting down API service")
+    engine = get_engine()
+    if engine.dialect.name == "sqlite":
+        # Refresh planner statistics once before the process exits
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA optimize")
+    engine.dispose()
 
 # Include routers
 app.include_router(users_router)
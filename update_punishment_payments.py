@@ -5,16 +5,19 @@ import sqlite3
 from datetime import datetime
 import logging
 
+from app.database import configure_connection, optimize_connection
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, 
                     format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def get_db_connection():
-    """Get a connection to the SQLite database"""
+    """Get a connection to the SQLite database, with the shared SQLite PRAGMAs applied"""
     db_path = os.path.join('database', 'penalties.db')
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
+    configure_connection(conn)
     return conn
 
 def update_punishment_payments(csv_file_path):
@@ -120,6 +123,7 @@ def update_punishment_payments(csv_file_path):
         conn.rollback()
         logger.error(f"Error updating punishment payments: {e}")
     finally:
+        optimize_connection(conn)
         conn.close()
 
 if __name__ == "__main__":